@@ -2,11 +2,32 @@ import React, { useState, useEffect } from "react";
 
 function Orders() {
   const [orders, setOrders] = useState([]);
-  useEffect(() => {
-    fetch("/api/orders", { credentials: "include" })
+  const [nextCursor, setNextCursor] = useState(null);
+  const [itemsByOrder, setItemsByOrder] = useState({});
+
+  function loadPage(after, append) {
+    let url = "/api/orders";
+    if (after) {
+      url += `?after=${encodeURIComponent(after)}`;
+    }
+    fetch(url, { credentials: "include" })
       .then((res) => res.json())
-      .then((data) => setOrders(data))
+      .then((data) => {
+        setOrders((prev) => (append ? [...prev, ...data.items] : data.items));
+        setNextCursor(data.next_cursor);
+      })
       .catch(() => setOrders([]));
+  }
+
+  function loadItems(orderId) {
+    fetch(`/api/orders/${orderId}/items`, { credentials: "include" })
+      .then((res) => res.json())
+      .then((items) => setItemsByOrder((prev) => ({ ...prev, [orderId]: items })))
+      .catch(() => {});
+  }
+
+  useEffect(() => {
+    loadPage(null, false);
   }, []);
 
   return (
@@ -22,17 +43,28 @@ function Orders() {
               <div className="order-status">Статус: <span>{order.status}</span></div>
               <div className="order-price">Сумма: {order.total_price} ₽</div>
               <div className="order-items">
-                <span>Товары:</span>
-                <ul>
-                  {order.items.map((item) => (
-                    <li key={item.id} className="order-item">{item.product_name} <span>x{item.quantity}</span></li>
-                  ))}
-                </ul>
+                {itemsByOrder[order.id] ? (
+                  <>
+                    <span>Товары:</span>
+                    <ul>
+                      {itemsByOrder[order.id].map((item) => (
+                        <li key={item.id} className="order-item">{item.product.name}</li>
+                      ))}
+                    </ul>
+                  </>
+                ) : (
+                  <button onClick={() => loadItems(order.id)}>Показать товары</button>
+                )}
               </div>
             </div>
           ))}
         </div>
       )}
+      {nextCursor && (
+        <button style={{ marginTop: 16 }} onClick={() => loadPage(nextCursor, true)}>
+          Показать ещё
+        </button>
+      )}
     </div>
   );
 }
@@ -4,12 +4,16 @@ export default function Products({ categoryId, onAddToCart }) {
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
 
-  useEffect(() => {
+  function loadPage(after, append) {
     let url = "/api/products";
     if (categoryId) {
       url = `/api/products/category/${categoryId}`;
     }
+    if (after) {
+      url += `?after=${encodeURIComponent(after)}`;
+    }
     fetch(url, {
       headers: {
         Authorization: `Bearer ${localStorage.getItem("access_token")}`,
@@ -20,13 +24,19 @@ export default function Products({ categoryId, onAddToCart }) {
         return res.json();
       })
       .then((data) => {
-        setProducts(data);
+        setProducts((prev) => (append ? [...prev, ...data.items] : data.items));
+        setNextCursor(data.next_cursor);
         setLoading(false);
       })
       .catch((e) => {
         setError(e.message);
         setLoading(false);
       });
+  }
+
+  useEffect(() => {
+    setLoading(true);
+    loadPage(null, false);
   }, [categoryId]);
 
   if (loading) return <div>Загрузка товаров...</div>;
@@ -60,6 +70,11 @@ export default function Products({ categoryId, onAddToCart }) {
           </div>
         ))}
       </div>
+      {nextCursor && (
+        <button style={{ marginTop: 16 }} onClick={() => loadPage(nextCursor, true)}>
+          Показать ещё
+        </button>
+      )}
     </div>
   );
 }
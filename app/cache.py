@@ -0,0 +1,124 @@
+import sys
+import time
+from collections import OrderedDict
+
+from pydantic import BaseModel
+
+from app.config import CATALOG_CACHE_TTL, CATALOG_CACHE_MAX_ENTRIES, CATALOG_CACHE_MAX_BYTES
+
+
+MISSING = object()
+
+
+def estimate_size(value) -> int:
+    """
+    Приблизительный размер значения в байтах (с учётом вложенных моделей и коллекций).
+    """
+    if isinstance(value, BaseModel):
+        return sys.getsizeof(value) + estimate_size(value.__dict__)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class TTLCache:
+    """
+    Внутрипроцессный LRU-кэш с TTL и ограничением по числу записей и суммарному размеру.
+
+    Кэш живёт в памяти одного воркера: запись в другом процессе его не инвалидирует,
+    поэтому TTL задаёт верхнюю границу устаревания данных при нескольких воркерах.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, int, object]] = OrderedDict()
+        self._bytes = 0
+        # Увеличивается при каждой инвалидации: результат загрузки, начатой до неё, не кэшируется
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        """Возвращает значение или MISSING, если записи нет или она устарела"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        expires_at, _, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value) -> None:
+        """Сохраняет значение, вытесняя самые давно использованные записи при переполнении"""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (time.monotonic() + self.ttl, size, value)
+        self._bytes += size
+        while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def get_or_load(self, key: str, load):
+        """Возвращает значение из кэша или вызывает load() и кэширует результат"""
+        value = self.get(key)
+        if value is MISSING:
+            generation = self._generation
+            value = await load()
+            if generation == self._generation:
+                self.set(key, value)
+        return value
+
+    def invalidate(self, key: str) -> None:
+        """Удаляет одну запись"""
+        self._generation += 1
+        if key in self._data:
+            self._remove(key)
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        """Удаляет все записи, ключ которых начинается с prefix"""
+        self._generation += 1
+        for key in [k for k in self._data if k.startswith(prefix)]:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._data.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+
+# Общий кэш чтений каталога: товары и категории
+catalog_cache = TTLCache(
+    max_entries=CATALOG_CACHE_MAX_ENTRIES,
+    max_bytes=CATALOG_CACHE_MAX_BYTES,
+    ttl=CATALOG_CACHE_TTL,
+)
@@ -0,0 +1,164 @@
+"""
+Идемпотентность POST-запросов по заголовку Idempotency-Key.
+
+Первый запрос с ключом захватывает его (строка без ответа), выполняет операцию
+и сохраняет тело и статус успешного ответа. Повтор с тем же ключом получает сохранённый
+ответ одним чтением по первичному ключу, без повторного выполнения операции.
+Повтор, пришедший пока первый запрос ещё выполняется, получает 409.
+Если операция завершилась ошибкой, ключ освобождается и запрос можно повторить.
+
+Ответ сохраняется сразу после коммита операции, отдельной транзакцией: если процесс
+упадёт между ними, ключ останется захваченным без ответа до истечения
+IDEMPOTENCY_KEY_TTL_HOURS.
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import timedelta
+
+from fastapi import Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy import select, update, delete, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import IDEMPOTENCY_KEY_TTL_HOURS, IDEMPOTENCY_PURGE_INTERVAL
+from app.database.database import async_session_maker
+from app.database.db_depends import get_async_db
+from app.models.idempotency import IdempotencyKey
+
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH = 1000
+
+
+class Idempotency:
+    def __init__(self, db: AsyncSession, key: str | None, fingerprint: str):
+        self.db = db
+        self.key = key
+        self.fingerprint = fingerprint
+
+    async def run(self, user_id: int, call) -> Response:
+        """
+        Выполняет call() не более одного раза для пары (пользователь, ключ).
+        call должен вернуть Response с готовым телом (например, json_response).
+        """
+        if self.key is None:
+            return await call()
+
+        stored = await self._lookup(user_id)
+        if stored is None:
+            if await self._claim(user_id):
+                return await self._execute(user_id, call)
+            stored = await self._lookup(user_id)
+        return self._replay(stored)
+
+    async def _lookup(self, user_id: int):
+        return (await self.db.execute(
+            select(IdempotencyKey.fingerprint, IdempotencyKey.response_status, IdempotencyKey.response_body)
+            .where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == self.key,
+                IdempotencyKey.created_at >= _expired_before()
+            )
+        )).first()
+
+    async def _claim(self, user_id: int) -> bool:
+        """Захватывает ключ; истёкшая запись с тем же ключом перезаписывается"""
+        stmt = pg_insert(IdempotencyKey).values(
+            user_id=user_id, key=self.key, fingerprint=self.fingerprint
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+            set_={
+                "fingerprint": stmt.excluded.fingerprint,
+                "response_status": None,
+                "response_body": None,
+                "created_at": func.now(),
+            },
+            where=IdempotencyKey.created_at < _expired_before()
+        ).returning(IdempotencyKey.key)
+        claimed = await self.db.scalar(stmt)
+        await self.db.commit()
+        return claimed is not None
+
+    async def _execute(self, user_id: int, call) -> Response:
+        where = (IdempotencyKey.user_id == user_id, IdempotencyKey.key == self.key)
+        try:
+            response = await call()
+        except Exception:
+            await self.db.rollback()
+            await self.db.execute(delete(IdempotencyKey).where(*where))
+            await self.db.commit()
+            raise
+        await self.db.execute(
+            update(IdempotencyKey).where(*where)
+            .values(response_status=response.status_code, response_body=response.body)
+        )
+        await self.db.commit()
+        return response
+
+    def _replay(self, stored) -> Response:
+        if stored is not None and stored.fingerprint != self.fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key уже использован для другого запроса"
+            )
+        if stored is None or stored.response_status is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Запрос с этим Idempotency-Key ещё выполняется"
+            )
+        return Response(
+            content=stored.response_body,
+            status_code=stored.response_status,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+
+def _expired_before():
+    return func.now() - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+async def get_idempotency(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = Header(None, max_length=200),
+) -> Idempotency:
+    """Зависимость: ключ из заголовка Idempotency-Key и отпечаток запроса (метод, путь, тело)"""
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.url.path}?{request.url.query}\n".encode())
+    digest.update(await request.body())
+    return Idempotency(db, idempotency_key, digest.hexdigest())
+
+
+async def purge_expired_keys(db: AsyncSession) -> int:
+    """Удаляет истёкшие ключи пачками, возвращает число удалённых строк"""
+    total = 0
+    while True:
+        expired = (
+            select(IdempotencyKey.user_id, IdempotencyKey.key)
+            .where(IdempotencyKey.created_at < _expired_before())
+            .limit(PURGE_BATCH)
+        )
+        deleted = (await db.execute(
+            delete(IdempotencyKey).where(
+                tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(expired)
+            )
+        )).rowcount
+        await db.commit()
+        total += deleted
+        if deleted < PURGE_BATCH:
+            return total
+
+
+async def run_purger() -> None:
+    """Фоновая задача: периодическое удаление истёкших ключей"""
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_PURGE_INTERVAL)
+        try:
+            async with async_session_maker() as db:
+                await purge_expired_keys(db)
+        except Exception:
+            logger.exception("Idempotency key purge failed")
@@ -0,0 +1,158 @@
+"""
+Архивация мягко удалённых строк.
+
+Неактивные строки (is_active = false), не менявшиеся дольше окна хранения, переносятся
+в таблицы <table>_archive пачками. Каждая пачка — один оператор
+WITH batch AS (SELECT ... FOR UPDATE SKIP LOCKED LIMIT n), moved AS (DELETE ... RETURNING)
+INSERT INTO <table>_archive, закоммиченный отдельно: блокируются только строки пачки,
+строки, занятые другими транзакциями, пропускаются, а прерванный запуск можно просто
+повторить — уже перенесённые строки из исходной таблицы удалены.
+
+Товары и категории архивируются, только если на них ничего не ссылается
+(позиции корзин и заказов, отзывы, дочерние категории). Категории уходят по одному
+уровню дерева за запуск: родитель освобождается, когда заархивированы его потомки.
+
+Запуск: python -m app.jobs.archive [--retention-days N] [--batch-size N] [--tables ...]
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import ARCHIVE_RETENTION_DAYS, ARCHIVE_BATCH_SIZE
+from app.database.database import async_session_maker
+from app.models.cart import Cart, CartItem
+from app.models.categories import Category
+from app.models.products import Product
+from app.models.reviews import Review
+from app.models.wishlist import WishlistItem
+
+
+logger = logging.getLogger(__name__)
+
+# Ожидание чужих блокировок ограничено: пачка откатывается, таблица добирается при следующем запуске
+LOCK_TIMEOUT = "2s"
+
+
+class ArchiveTarget(NamedTuple):
+    table: object
+    # Дополнительное условие отбора строк (SQL по алиасу t)
+    condition: str = ""
+    # Связанные строки, удаляемые вместе с пачкой (SQL DELETE ... USING batch)
+    cleanup: str = ""
+
+
+# Порядок важен: сначала зависимые строки, затем то, на что они ссылаются
+ARCHIVE_TARGETS = {
+    "reviews": ArchiveTarget(Review.__table__),
+    "wishlist_items": ArchiveTarget(WishlistItem.__table__),
+    "cart_items": ArchiveTarget(CartItem.__table__),
+    "carts": ArchiveTarget(
+        Cart.__table__,
+        condition=(
+            "NOT EXISTS (SELECT 1 FROM cart_items r WHERE r.cart_id = t.id) "
+            "AND NOT EXISTS (SELECT 1 FROM reservations r WHERE r.cart_id = t.id)"
+        ),
+    ),
+    "products": ArchiveTarget(
+        Product.__table__,
+        condition=(
+            "NOT EXISTS (SELECT 1 FROM cart_items r WHERE r.product_id = t.id) "
+            "AND NOT EXISTS (SELECT 1 FROM wishlist_items r WHERE r.product_id = t.id) "
+            "AND NOT EXISTS (SELECT 1 FROM reviews r WHERE r.product_id = t.id) "
+            "AND NOT EXISTS (SELECT 1 FROM orderitems r WHERE r.product_id = t.id) "
+            "AND NOT EXISTS (SELECT 1 FROM reservations r WHERE r.product_id = t.id)"
+        ),
+    ),
+    "categories": ArchiveTarget(
+        Category.__table__,
+        condition=(
+            "NOT EXISTS (SELECT 1 FROM products r WHERE r.category_id = t.id) "
+            "AND NOT EXISTS (SELECT 1 FROM categories r WHERE r.parent_id = t.id)"
+        ),
+        # У листовой категории в таблице замыкания остаются только пути от её предков
+        cleanup="DELETE FROM category_closure c USING batch WHERE c.descendant_id = batch.id",
+    ),
+}
+
+
+def build_archive_statement(target: ArchiveTarget):
+    """
+    Оператор переноса одной пачки. Колонки перечисляются явно (без генерируемых),
+    поэтому порядок колонок в архивной таблице значения не имеет.
+    """
+    table = target.table.name
+    columns = ", ".join(c.name for c in target.table.columns if c.computed is None)
+    condition = f"AND {target.condition}" if target.condition else ""
+    cleanup = f"cleanup AS ({target.cleanup}), " if target.cleanup else ""
+    return text(
+        f"WITH batch AS ("
+        f"SELECT t.id FROM {table} t "
+        f"WHERE t.is_active = false AND t.updated_at < :cutoff {condition} "
+        f"ORDER BY t.updated_at LIMIT :batch_size FOR UPDATE OF t SKIP LOCKED"
+        f"), {cleanup}moved AS ("
+        f"DELETE FROM {table} t USING batch WHERE t.id = batch.id RETURNING t.*"
+        f") "
+        f"INSERT INTO {table}_archive ({columns}) SELECT {columns} FROM moved"
+    )
+
+
+async def archive_table(session_factory: async_sessionmaker, target: ArchiveTarget,
+                        cutoff: datetime, batch_size: int) -> int:
+    """
+    Переносит строки таблицы пачками, пока не останется подходящих. Возвращает число строк.
+    """
+    stmt = build_archive_statement(target)
+    total = 0
+    async with session_factory() as db:
+        while True:
+            try:
+                await db.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+                moved = (await db.execute(stmt, {"cutoff": cutoff, "batch_size": batch_size})).rowcount
+                await db.commit()
+            except DBAPIError:
+                await db.rollback()
+                logger.warning("Archiving %s stopped after %d rows", target.table.name, total, exc_info=True)
+                break
+            total += moved
+            if moved < batch_size:
+                break
+    return total
+
+
+async def archive(retention_days: int = ARCHIVE_RETENTION_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE,
+                  tables: list[str] | None = None,
+                  session_factory: async_sessionmaker = async_session_maker) -> dict[str, int]:
+    """
+    Архивирует неактивные строки старше retention_days дней во всех (или указанных) таблицах.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    result = {}
+    for name, target in ARCHIVE_TARGETS.items():
+        if tables and name not in tables:
+            continue
+        result[name] = await archive_table(session_factory, target, cutoff, batch_size)
+        logger.info("Archived %d rows from %s", result[name], name)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive soft-deleted rows")
+    parser.add_argument("--retention-days", type=int, default=ARCHIVE_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--tables", nargs="+", choices=list(ARCHIVE_TARGETS))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(archive(args.retention_days, args.batch_size, args.tables))
+    for name, count in result.items():
+        print(f"{name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
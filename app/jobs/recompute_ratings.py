@@ -0,0 +1,142 @@
+"""
+Пересчёт рейтингов товаров по активным отзывам.
+
+Нужен после исправлений данных, импорта и архивации, когда счётчики рейтинга
+(rating_sum, rating_count, rating, гистограмма rating_1..rating_5) могли разойтись с отзывами. Товары обрабатываются
+диапазонами id; каждый диапазон — один UPDATE products ... FROM (SELECT ... GROUP BY)
+в отдельной транзакции, поэтому блокировки держатся только на время одного диапазона.
+Строки, у которых ничего не изменилось, не перезаписываются. Кэш каталога
+в процессах приложения догонит изменения по истечении CATALOG_CACHE_TTL.
+
+Запуск: python -m app.jobs.recompute_ratings [--chunk-size N] [--product-ids ...]
+        [--category-id N] [--seller-id N]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import NamedTuple
+
+from sqlalchemy import select, update, func, and_, or_
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.database.database import async_session_maker
+from app.models.products import Product, GRADES
+from app.models.reviews import Review
+from app.services.reviews import derived_rating
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class RecomputeReport(NamedTuple):
+    scanned: int
+    updated: int
+    seconds: float
+
+    @property
+    def per_second(self) -> float:
+        return self.scanned / self.seconds if self.seconds else float(self.scanned)
+
+
+def _product_filters(product_ids: list[int] | None, category_id: int | None,
+                     seller_id: int | None) -> list:
+    conditions = []
+    if product_ids:
+        conditions.append(Product.id.in_(product_ids))
+    if category_id is not None:
+        conditions.append(Product.category_id == category_id)
+    if seller_id is not None:
+        conditions.append(Product.seller_id == seller_id)
+    return conditions
+
+
+def build_recompute_statement(low: int, high: int, conditions: list):
+    """
+    UPDATE товаров с id в [low, high) по агрегатам активных отзывов.
+    Товары без отзывов получают нулевые счётчики и rating = NULL.
+    """
+    histogram = [f"rating_{grade}" for grade in GRADES]
+    totals = (
+        select(
+            Product.id.label("product_id"),
+            func.coalesce(func.sum(Review.grade), 0).label("rating_sum"),
+            func.count(Review.id).label("rating_count"),
+            *(func.count(Review.id).filter(Review.grade == grade).label(f"rating_{grade}") for grade in GRADES),
+        )
+        .outerjoin(Review, and_(Review.product_id == Product.id, Review.is_active == True))
+        .where(Product.id >= low, Product.id < high, *conditions)
+        .group_by(Product.id)
+        .subquery("totals")
+    )
+    return (
+        update(Product)
+        .where(
+            Product.id == totals.c.product_id,
+            or_(
+                Product.rating_sum != totals.c.rating_sum,
+                Product.rating_count != totals.c.rating_count,
+                Product.rating.is_distinct_from(derived_rating(totals.c.rating_sum, totals.c.rating_count)),
+                *(getattr(Product, name) != totals.c[name] for name in histogram),
+            )
+        )
+        .values(
+            rating_sum=totals.c.rating_sum,
+            rating_count=totals.c.rating_count,
+            rating=derived_rating(totals.c.rating_sum, totals.c.rating_count),
+            **{name: totals.c[name] for name in histogram},
+        )
+        .returning(Product.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def recompute_ratings(product_ids: list[int] | None = None, category_id: int | None = None,
+                            seller_id: int | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            session_factory: async_sessionmaker = async_session_maker) -> RecomputeReport:
+    """
+    Пересчитывает рейтинги всех товаров или выбранных фильтрами, диапазонами по chunk_size id.
+    """
+    conditions = _product_filters(product_ids, category_id, seller_id)
+    started = time.monotonic()
+    scanned = updated = 0
+
+    async with session_factory() as db:
+        bounds = (await db.execute(
+            select(func.min(Product.id), func.max(Product.id), func.count()).where(*conditions)
+        )).one()
+        low, high, scanned = bounds
+        if low is None:
+            return RecomputeReport(0, 0, time.monotonic() - started)
+
+        for start in range(low, high + 1, chunk_size):
+            changed = (await db.scalars(
+                build_recompute_statement(start, start + chunk_size, conditions)
+            )).all()
+            await db.commit()
+            updated += len(changed)
+            logger.info("Products %d..%d: %d updated", start, start + chunk_size - 1, len(changed))
+
+    return RecomputeReport(scanned, updated, time.monotonic() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recompute product ratings from active reviews")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--product-ids", type=int, nargs="+")
+    parser.add_argument("--category-id", type=int)
+    parser.add_argument("--seller-id", type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = asyncio.run(recompute_ratings(
+        args.product_ids, args.category_id, args.seller_id, args.chunk_size
+    ))
+    print(f"scanned: {report.scanned}, updated: {report.updated}, "
+          f"{report.seconds:.1f}s, {report.per_second:.0f} products/s")
+
+
+if __name__ == "__main__":
+    main()
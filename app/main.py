@@ -1,12 +1,39 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from app.routers import categories, products, users, reviews, cart, wishlist, order
+from app.routers import categories, products, users, reviews, cart, wishlist, order, cache, export
+from app.database.database import async_session_maker
+from app.services.cart_store import cart_store
+from app.services.reservations import run_sweeper
+from app.idempotency import run_purger
 from fastapi.middleware.cors import CORSMiddleware
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Фоновый сброс буферизованных изменений корзин (и финальный сброс при остановке),
+    уборка истёкших резервов и ключей идемпотентности.
+    """
+    flusher = asyncio.create_task(cart_store.run_flusher()) if cart_store.buffered else None
+    sweeper = asyncio.create_task(run_sweeper())
+    purger = asyncio.create_task(run_purger())
+    yield
+    sweeper.cancel()
+    purger.cancel()
+    if flusher:
+        flusher.cancel()
+        async with async_session_maker() as db:
+            await cart_store.flush(db)
+
+
 # Создаём приложение FastAPI
 app = FastAPI(
     title="FastAPI Интернет-магазин",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Подключаем маршруты категорий и товаров
@@ -17,6 +44,8 @@ app.include_router(reviews.router, prefix="/api")
 app.include_router(cart.router, prefix="/api")
 app.include_router(wishlist.router, prefix="/api")
 app.include_router(order.router, prefix="/api")
+app.include_router(cache.router, prefix="/api")
+app.include_router(export.router, prefix="/api")
 
 
 # Корневой эндпоинт для проверки
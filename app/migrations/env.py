@@ -8,7 +8,7 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 
 from app.database.database import Base
-from app.models import cart, categories, products, reviews, users, wishlist, orders
+from app.models import cart, categories, products, reviews, users, wishlist, orders, reservations, idempotency
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,31 @@
+"""Add wishlist indexes
+
+Revision ID: 0a6c94d25e7f
+Revises: b7d2e61f3c58
+Create Date: 2026-10-18 17:40:08.351962
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6c94d25e7f'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e61f3c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_wishlist_user_id'), 'wishlist', ['user_id'], unique=False)
+    op.create_index('ix_wishlist_items_wishlist_active', 'wishlist_items', ['wishlist_id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_wishlist_items_wishlist_active', table_name='wishlist_items')
+    op.drop_index(op.f('ix_wishlist_user_id'), table_name='wishlist')
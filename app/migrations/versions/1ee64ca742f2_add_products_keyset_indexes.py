@@ -0,0 +1,32 @@
+"""Add products keyset indexes
+
+Revision ID: 1ee64ca742f2
+Revises: 425c484a16d9
+Create Date: 2026-10-18 10:02:11.412305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1ee64ca742f2'
+down_revision: Union[str, Sequence[str], None] = '425c484a16d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_products_active_id', 'products', ['id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    op.create_index('ix_products_active_category_id', 'products', ['category_id', 'id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_active_category_id', table_name='products')
+    op.drop_index('ix_products_active_id', table_name='products')
@@ -0,0 +1,31 @@
+"""Add updated_at columns
+
+Revision ID: 4f27b9e1d8a0
+Revises: e3a8c5f06b1d
+Create Date: 2026-10-18 15:31:44.207591
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f27b9e1d8a0'
+down_revision: Union[str, Sequence[str], None] = 'e3a8c5f06b1d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('products', 'categories', 'reviews'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True),
+                                       server_default=sa.text('now()'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('reviews', 'categories', 'products'):
+        op.drop_column(table, 'updated_at')
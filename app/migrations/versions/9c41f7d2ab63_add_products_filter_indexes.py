@@ -0,0 +1,38 @@
+"""Add products filter indexes
+
+Revision ID: 9c41f7d2ab63
+Revises: 5b0d3e8a91c4
+Create Date: 2026-10-18 12:47:05.118273
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c41f7d2ab63'
+down_revision: Union[str, Sequence[str], None] = '5b0d3e8a91c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_products_active_category_price', 'products', ['category_id', 'price', 'id'],
+                    unique=False, postgresql_where=sa.text('is_active'))
+    op.create_index('ix_products_active_price', 'products', ['price', 'id'],
+                    unique=False, postgresql_where=sa.text('is_active'))
+    op.create_index('ix_products_active_seller_id', 'products', ['seller_id', 'id'],
+                    unique=False, postgresql_where=sa.text('is_active'))
+    op.create_index('ix_products_active_rating', 'products', [sa.text('coalesce(rating, 0.0)'), 'id'],
+                    unique=False, postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_active_rating', table_name='products')
+    op.drop_index('ix_products_active_seller_id', table_name='products')
+    op.drop_index('ix_products_active_price', table_name='products')
+    op.drop_index('ix_products_active_category_price', table_name='products')
@@ -0,0 +1,45 @@
+"""Add products rating counters
+
+Revision ID: a4d7e2c9f815
+Revises: 8e2c47a1b9f6
+Create Date: 2026-10-18 22:05:36.740219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d7e2c9f815'
+down_revision: Union[str, Sequence[str], None] = '8e2c47a1b9f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('products', 'products_archive'):
+        op.add_column(table, sa.Column('rating_sum', sa.Integer(), server_default=sa.text('0'), nullable=False))
+        op.add_column(table, sa.Column('rating_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.execute("""
+        UPDATE products p
+        SET rating_sum = s.rating_sum,
+            rating_count = s.rating_count,
+            rating = round(s.rating_sum::numeric / s.rating_count, 2)
+        FROM (
+            SELECT product_id, sum(grade) AS rating_sum, count(*) AS rating_count
+            FROM reviews
+            WHERE is_active
+            GROUP BY product_id
+        ) s
+        WHERE p.id = s.product_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('products_archive', 'products'):
+        op.drop_column(table, 'rating_count')
+        op.drop_column(table, 'rating_sum')
@@ -0,0 +1,39 @@
+"""Add reviews keyset indexes
+
+Revision ID: b6f1c8e3d047
+Revises: a4d7e2c9f815
+Create Date: 2026-10-18 22:51:12.664390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6f1c8e3d047'
+down_revision: Union[str, Sequence[str], None] = 'a4d7e2c9f815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_reviews_product_active_date', 'reviews',
+                    ['product_id', 'is_active', 'comment_date', 'id'], unique=False)
+    op.create_index('ix_reviews_user_active_date', 'reviews',
+                    ['user_id', 'is_active', 'comment_date', 'id'], unique=False)
+    op.create_index('ix_reviews_active_date', 'reviews', ['is_active', 'comment_date', 'id'], unique=False)
+    # Одиночные индексы являются префиксами новых составных
+    op.drop_index(op.f('ix_reviews_product_id'), table_name='reviews')
+    op.drop_index(op.f('ix_reviews_user_id'), table_name='reviews')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_reviews_user_id'), 'reviews', ['user_id'], unique=False)
+    op.create_index(op.f('ix_reviews_product_id'), 'reviews', ['product_id'], unique=False)
+    op.drop_index('ix_reviews_active_date', table_name='reviews')
+    op.drop_index('ix_reviews_user_active_date', table_name='reviews')
+    op.drop_index('ix_reviews_product_active_date', table_name='reviews')
@@ -0,0 +1,53 @@
+"""Add cart items active unique index
+
+Revision ID: b7d2e61f3c58
+Revises: 4f27b9e1d8a0
+Create Date: 2026-10-18 16:52:19.774036
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e61f3c58'
+down_revision: Union[str, Sequence[str], None] = '4f27b9e1d8a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Схлопываем дубли активных позиций, созданные параллельными добавлениями:
+    # количество суммируется в строку с минимальным id, остальные деактивируются
+    op.execute("""
+        WITH dups AS (
+            SELECT id,
+                   min(id) OVER (PARTITION BY cart_id, product_id) AS keep_id,
+                   sum(quantity) OVER (PARTITION BY cart_id, product_id) AS total
+            FROM cart_items
+            WHERE is_active
+        )
+        UPDATE cart_items SET quantity = dups.total
+        FROM dups
+        WHERE cart_items.id = dups.id AND dups.id = dups.keep_id AND cart_items.quantity <> dups.total
+    """)
+    op.execute("""
+        WITH dups AS (
+            SELECT id, min(id) OVER (PARTITION BY cart_id, product_id) AS keep_id
+            FROM cart_items
+            WHERE is_active
+        )
+        UPDATE cart_items SET is_active = false
+        FROM dups
+        WHERE cart_items.id = dups.id AND dups.id <> dups.keep_id
+    """)
+    op.create_index('uq_cart_items_cart_product_active', 'cart_items', ['cart_id', 'product_id'],
+                    unique=True, postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_cart_items_cart_product_active', table_name='cart_items')
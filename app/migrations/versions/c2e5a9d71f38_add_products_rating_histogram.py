@@ -0,0 +1,51 @@
+"""Add products rating histogram
+
+Revision ID: c2e5a9d71f38
+Revises: b6f1c8e3d047
+Create Date: 2026-10-18 23:24:47.093815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e5a9d71f38'
+down_revision: Union[str, Sequence[str], None] = 'b6f1c8e3d047'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HISTOGRAM_COLUMNS = [f'rating_{grade}' for grade in range(1, 6)]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('products', 'products_archive'):
+        for name in HISTOGRAM_COLUMNS:
+            op.add_column(table, sa.Column(name, sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.execute("""
+        UPDATE products p
+        SET rating_1 = s.rating_1, rating_2 = s.rating_2, rating_3 = s.rating_3,
+            rating_4 = s.rating_4, rating_5 = s.rating_5
+        FROM (
+            SELECT product_id,
+                   count(*) FILTER (WHERE grade = 1) AS rating_1,
+                   count(*) FILTER (WHERE grade = 2) AS rating_2,
+                   count(*) FILTER (WHERE grade = 3) AS rating_3,
+                   count(*) FILTER (WHERE grade = 4) AS rating_4,
+                   count(*) FILTER (WHERE grade = 5) AS rating_5
+            FROM reviews
+            WHERE is_active
+            GROUP BY product_id
+        ) s
+        WHERE p.id = s.product_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('products_archive', 'products'):
+        for name in reversed(HISTOGRAM_COLUMNS):
+            op.drop_column(table, name)
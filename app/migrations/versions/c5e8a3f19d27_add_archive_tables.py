@@ -0,0 +1,47 @@
+"""Add archive tables
+
+Revision ID: c5e8a3f19d27
+Revises: 0a6c94d25e7f
+Create Date: 2026-10-18 19:12:37.584120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e8a3f19d27'
+down_revision: Union[str, Sequence[str], None] = '0a6c94d25e7f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ARCHIVED_TABLES = ('reviews', 'wishlist_items', 'cart_items', 'carts', 'products', 'categories')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('carts', 'cart_items', 'wishlist_items'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True),
+                                       server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_cart_items_inactive_updated_at', 'cart_items', ['updated_at'], unique=False,
+                    postgresql_where=sa.text('NOT is_active'))
+
+    # Архивные копии без внешних ключей и индексов, кроме первичного ключа
+    for table in ARCHIVED_TABLES:
+        op.execute(f'CREATE TABLE {table}_archive (LIKE {table})')
+        op.execute(f'ALTER TABLE {table}_archive ADD PRIMARY KEY (id)')
+        op.add_column(f'{table}_archive', sa.Column('archived_at', sa.DateTime(timezone=True),
+                                                    server_default=sa.text('now()'), nullable=False))
+    # Поисковый вектор вычисляется из name/description и в архиве не нужен
+    op.drop_column('products_archive', 'search_vector')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(ARCHIVED_TABLES):
+        op.drop_table(f'{table}_archive')
+    op.drop_index('ix_cart_items_inactive_updated_at', table_name='cart_items')
+    for table in ('wishlist_items', 'cart_items', 'carts'):
+        op.drop_column(table, 'updated_at')
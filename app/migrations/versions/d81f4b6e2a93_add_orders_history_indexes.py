@@ -0,0 +1,31 @@
+"""Add orders history indexes
+
+Revision ID: d81f4b6e2a93
+Revises: c5e8a3f19d27
+Create Date: 2026-10-18 19:58:02.916734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4b6e2a93'
+down_revision: Union[str, Sequence[str], None] = 'c5e8a3f19d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_orders_user_id_created_at', 'orders',
+                    ['user_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+    op.create_index(op.f('ix_orderitems_order_id'), 'orderitems', ['order_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_orderitems_order_id'), table_name='orderitems')
+    op.drop_index('ix_orders_user_id_created_at', table_name='orders')
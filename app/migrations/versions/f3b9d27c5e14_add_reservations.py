@@ -0,0 +1,44 @@
+"""Add reservations
+
+Revision ID: f3b9d27c5e14
+Revises: d81f4b6e2a93
+Create Date: 2026-10-18 20:46:19.305517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9d27c5e14'
+down_revision: Union[str, Sequence[str], None] = 'd81f4b6e2a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reservations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cart_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['cart_id'], ['carts.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cart_id', 'product_id', name='uq_reservations_cart_product')
+    )
+    op.create_index('ix_reservations_product_expires', 'reservations', ['product_id', 'expires_at'], unique=False,
+                    postgresql_include=['quantity', 'cart_id'])
+    op.create_index('ix_reservations_expires_at', 'reservations', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reservations_expires_at', table_name='reservations')
+    op.drop_index('ix_reservations_product_expires', table_name='reservations')
+    op.drop_table('reservations')
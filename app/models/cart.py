@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, text, ForeignKey, Boolean
+from datetime import datetime
+from sqlalchemy import Integer, text, ForeignKey, Boolean, Index, DateTime, func
 from typing import TYPE_CHECKING
 from app.database.database import Base
 
@@ -14,6 +15,7 @@ class Cart(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), unique=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     user: Mapped['User'] = relationship('User', back_populates='cart')
     items: Mapped[list["CartItem"]] = relationship("CartItem", back_populates="cart")
@@ -21,6 +23,13 @@ class Cart(Base):
 
 class CartItem(Base):
     __tablename__ = "cart_items"
+    __table_args__ = (
+        # Одна активная строка на товар в корзине: цель для INSERT ... ON CONFLICT при добавлении
+        Index("uq_cart_items_cart_product_active", "cart_id", "product_id",
+              unique=True, postgresql_where=text("is_active")),
+        # Очередь архивации: неактивные позиции по времени деактивации
+        Index("ix_cart_items_inactive_updated_at", "updated_at", postgresql_where=text("NOT is_active")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     cart_id: Mapped[int] = mapped_column(ForeignKey("carts.id"))
@@ -29,6 +38,7 @@ class CartItem(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, 
                                         server_default=text("true"), 
                                         nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     cart: Mapped["Cart"] = relationship("Cart", back_populates="items")
     product: Mapped["Product"] = relationship("Product")
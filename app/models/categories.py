@@ -1,4 +1,5 @@
-from sqlalchemy import ForeignKey, String, Boolean
+from datetime import datetime
+from sqlalchemy import ForeignKey, String, Boolean, Integer, DateTime, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import TYPE_CHECKING, Optional
 
@@ -16,9 +17,20 @@ class Category(Base):
     name: Mapped[str] = mapped_column(String(50), nullable=False)
     parent_id: Mapped[int | None] = mapped_column(ForeignKey("categories.id"), nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     products: Mapped[list["Product"]] = relationship("Product", back_populates="category")
     parent: Mapped[Optional["Category"]] = relationship("Category",back_populates="children",remote_side="Category.id")
     children: Mapped[list["Category"]] = relationship("Category",back_populates="parent")
-    
 
+
+class CategoryClosure(Base):
+    """
+    Таблица замыкания дерева категорий: пара (предок, потомок) для каждого пути, включая (id, id).
+    Позволяет выбрать всё поддерево категории одним индексированным запросом.
+    """
+    __tablename__ = "category_closure"
+
+    ancestor_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), primary_key=True)
+    descendant_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), primary_key=True, index=True)
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)
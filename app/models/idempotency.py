@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Integer, String, LargeBinary, DateTime, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Сохранённый результат POST-запроса с заголовком Idempotency-Key.
+    Пока запрос выполняется, response_status пустой.
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    key: Mapped[str] = mapped_column(String(200), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    response_status: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    response_body: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,6 +1,6 @@
 from datetime import datetime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Float, Integer, ForeignKey, func, DateTime, Enum as SqlEnum
+from sqlalchemy import Float, Integer, ForeignKey, Index, func, DateTime, Enum as SqlEnum
 from enum import Enum
 from typing import TYPE_CHECKING
 
@@ -38,13 +38,17 @@ class Order(Base):
     user: Mapped['User'] = relationship('User', back_populates='orders')
     orderitems: Mapped[list['OrderItem']] = relationship('OrderItem', back_populates='order')
 
+
+# История заказов пользователя: keyset-пагинация по (created_at, id) от новых к старым
+Index("ix_orders_user_id_created_at", Order.user_id, Order.created_at.desc(), Order.id.desc())
+
     
     
 class OrderItem(Base):
     __tablename__ = 'orderitems'
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    order_id: Mapped[int] = mapped_column(ForeignKey('orders.id'))
+    order_id: Mapped[int] = mapped_column(ForeignKey('orders.id'), index=True)
     product_id: Mapped[int] = mapped_column(ForeignKey('products.id'))
     price: Mapped[float] = mapped_column(Float, default=0.0)
     quantity: Mapped[int] = mapped_column(Integer, default=1)
@@ -1,5 +1,7 @@
+from datetime import datetime
 from typing import TYPE_CHECKING
-from sqlalchemy import String, Boolean, Float, Integer
+from sqlalchemy import String, Boolean, Float, Integer, DateTime, Index, Computed, text, func, literal_column
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import ForeignKey  
 
@@ -13,9 +15,27 @@ if TYPE_CHECKING:
     from app.models.orders import OrderItem
 
 
+GRADES = range(1, 6)
+
+SEARCH_CONFIG = "russian"
+SEARCH_VECTOR_EXPRESSION = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')"
+)
+
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Индексы под keyset-пагинацию каталога: (ключ сортировки, id) только по активным товарам
+        Index("ix_products_active_id", "id", postgresql_where=text("is_active")),
+        Index("ix_products_active_category_id", "category_id", "id", postgresql_where=text("is_active")),
+        Index("ix_products_active_category_price", "category_id", "price", "id", postgresql_where=text("is_active")),
+        Index("ix_products_active_price", "price", "id", postgresql_where=text("is_active")),
+        Index("ix_products_active_seller_id", "seller_id", "id", postgresql_where=text("is_active")),
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin",
+              postgresql_where=text("is_active")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -27,10 +47,42 @@ class Product(Base):
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), nullable=False)
     seller_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)  # New
     rating: Mapped[float | None] = mapped_column(Float, default=None, nullable=True)
+    # Сумма и количество оценок активных отзывов; rating = round(rating_sum / rating_count, 2)
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"), nullable=False)
+    rating_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"), nullable=False)
+    # Гистограмма оценок: количество активных отзывов с оценкой 1..5
+    rating_1: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"), nullable=False)
+    rating_2: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"), nullable=False)
+    rating_3: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"), nullable=False)
+    rating_4: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"), nullable=False)
+    rating_5: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"), nullable=False)
+    # Версия строки для ETag: меняется при любом UPDATE товара (в т.ч. пересчёте рейтинга)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Генерируемый tsvector для полнотекстового поиска: название весит больше описания
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+        deferred=True,
+    )
 
     category: Mapped["Category"] = relationship("Category", back_populates="products")
     seller: Mapped['User'] = relationship("User", back_populates="products")  # New
     reviews: Mapped[list['Review']] = relationship('Review', back_populates='product')
     cart_items: Mapped[list["CartItem"]] = relationship("CartItem", back_populates="product")
     wishlist_items: Mapped[list['WishlistItem']] = relationship('WishlistItem', back_populates='product')
-    orderitems: Mapped[list['OrderItem']] = relationship("OrderItem", back_populates='product')
\ No newline at end of file
+    orderitems: Mapped[list['OrderItem']] = relationship("OrderItem", back_populates='product')
+
+    @property
+    def rating_histogram(self) -> dict:
+        return {
+            "product_id": self.id,
+            "total": self.rating_count,
+            "counts": {grade: getattr(self, f"rating_{grade}") for grade in GRADES},
+        }
+
+
+# Ключ сортировки по рейтингу: товары без оценок идут как 0, чтобы сравнение кортежей
+# в keyset-пагинации не спотыкалось о NULL. Индекс построен по тому же выражению.
+RATING_SORT_KEY = func.coalesce(Product.rating, literal_column("0.0", Float))
+
+Index("ix_products_active_rating", RATING_SORT_KEY, Product.id, postgresql_where=Product.is_active)
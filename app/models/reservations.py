@@ -0,0 +1,29 @@
+from datetime import datetime
+from sqlalchemy import Integer, ForeignKey, DateTime, Index, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.database import Base
+
+
+class Reservation(Base):
+    """
+    Временное резервирование товара под позицию корзины.
+    Доступный остаток товара = stock - сумма неистёкших резервов.
+    """
+    __tablename__ = "reservations"
+    __table_args__ = (
+        # Один резерв на товар в корзине: повторное резервирование заменяет его
+        UniqueConstraint("cart_id", "product_id", name="uq_reservations_cart_product"),
+        # Сумма активных резервов по товару читается только из индекса
+        Index("ix_reservations_product_expires", "product_id", "expires_at",
+              postgresql_include=["quantity", "cart_id"]),
+        # Очередь уборщика истёкших резервов
+        Index("ix_reservations_expires_at", "expires_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    cart_id: Mapped[int] = mapped_column(ForeignKey("carts.id"), nullable=False)
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
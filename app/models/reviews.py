@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Text, BOOLEAN, ForeignKey
+from sqlalchemy import Integer, String, Text, BOOLEAN, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship, mapped_column, Mapped
 from typing import TYPE_CHECKING
 from datetime import datetime, timezone
@@ -10,13 +10,20 @@ if TYPE_CHECKING:
 
 class Review(Base):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        # Keyset-пагинация отзывов от новых к старым: (фильтр, is_active, comment_date, id)
+        Index("ix_reviews_product_active_date", "product_id", "is_active", "comment_date", "id"),
+        Index("ix_reviews_user_active_date", "user_id", "is_active", "comment_date", "id"),
+        Index("ix_reviews_active_date", "is_active", "comment_date", "id"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=False, index=True)
-    product_id: Mapped[int] = mapped_column(Integer, ForeignKey('products.id'), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=False)
+    product_id: Mapped[int] = mapped_column(Integer, ForeignKey('products.id'), nullable=False)
     comment: Mapped[str] = mapped_column(Text, nullable=True)
     comment_date: Mapped[datetime] = mapped_column(default=datetime.now)
     grade: Mapped[int] = mapped_column(Integer)
     is_active: Mapped[bool] = mapped_column(BOOLEAN, default=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     user: Mapped['User'] = relationship('User', back_populates='reviews')
     product: Mapped['Product'] = relationship('Product', back_populates='reviews')
\ No newline at end of file
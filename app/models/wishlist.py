@@ -1,5 +1,6 @@
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from sqlalchemy import Integer, Boolean, ForeignKey
+from datetime import datetime
+from sqlalchemy import Integer, Boolean, ForeignKey, Index, DateTime, text, func
 from typing import TYPE_CHECKING
 from app.database.database import Base
 
@@ -12,7 +13,7 @@ class Wishlist(Base):
     __tablename__ = 'wishlist'
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'))
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), index=True)
 
     user: Mapped['User'] = relationship('User', back_populates='wishlist')
     items: Mapped[list['WishlistItem']] = relationship('WishlistItem', back_populates='wishlist')
@@ -22,11 +23,15 @@ class Wishlist(Base):
 
 class WishlistItem(Base):
     __tablename__ = "wishlist_items"
+    __table_args__ = (
+        Index("ix_wishlist_items_wishlist_active", "wishlist_id", postgresql_where=text("is_active")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     wishlist_id: Mapped[int] = mapped_column(ForeignKey('wishlist.id'))
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id"))
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
     wishlist: Mapped['Wishlist'] = relationship('Wishlist', back_populates='items')
@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, tuple_
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values: list) -> str:
+    """
+    Кодирует значения ключа сортировки последней строки страницы в непрозрачный курсор.
+    """
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list) -> list:
+    """
+    Декодирует курсор и приводит значения к типам колонок ключа сортировки.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [_coerce(value, column) for value, column in zip(values, columns)]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _coerce(value, column):
+    """Приводит значение из курсора к python-типу колонки"""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is float and isinstance(value, int):
+        return float(value)
+    if not isinstance(value, python_type):
+        raise ValueError
+    return value
+
+
+def keyset(stmt: Select, columns: list, limit: int, after: str | None = None,
+           descending: bool = False) -> Select:
+    """
+    Добавляет к запросу keyset-пагинацию по набору колонок (последняя — уникальный id).
+
+    Вместо OFFSET используется сравнение кортежей (sort_key, id) > (:sort_key, :id),
+    поэтому любая страница читается по индексу за то же время, что и первая.
+    Запрашивается limit + 1 строка, чтобы понять, есть ли следующая страница.
+    """
+    if after:
+        values = decode_cursor(after, columns)
+        key, bound = tuple_(*columns), tuple_(*values)
+        stmt = stmt.where(key < bound if descending else key > bound)
+    order = [c.desc() if descending else c.asc() for c in columns]
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+def page(rows: list, limit: int, key) -> tuple[list, str | None]:
+    """
+    Обрезает лишнюю строку и строит курсор следующей страницы.
+    key — функция, возвращающая значения ключа сортировки для строки.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(key(rows[-1]))
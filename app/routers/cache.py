@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends
+from typing import Annotated
+
+from app.auth import get_current_admin
+from app.models.users import User as UserModel
+from app.cache import catalog_cache
+
+router = APIRouter(
+    prefix="/cache",
+    tags=["Cache"],
+)
+
+
+@router.get("/stats")
+async def get_cache_stats(
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+):
+    """
+    Возвращает счётчики кэша каталога: попадания, промахи, вытеснения и занятый объём (только для администраторов).
+    """
+    return catalog_cache.stats()
+
+
+@router.delete("/")
+async def clear_cache(
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+):
+    """
+    Полностью очищает кэш каталога текущего процесса (только для администраторов).
+    """
+    catalog_cache.clear()
+    return {"message": "Cache cleared"}
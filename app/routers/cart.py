@@ -1,39 +1,15 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Body, Depends, status
 from typing import Annotated
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.db_depends import get_async_db
 from app.auth import get_current_buyer
 from app.models.users import User as UserModel
-from app.shemas import Cart, CartItems, CartItemCreate
-
-def cart_to_dict(cart):
-    return {
-        "id": cart.id,
-        "user_id": cart.user_id,
-        "items": [
-            {
-                "id": item.id,
-                "product_id": item.product_id,
-                "quantity": item.quantity,
-                "is_active": item.is_active,
-                "product": {
-                    "id": item.product.id,
-                    "name": item.product.name,
-                    "price": item.product.price,
-                    "category_id": item.product.category_id,
-                    "category": {
-                        "name": item.product.category.name
-                    } if item.product.category else None,
-                } if item.product else None,
-                "total_price_product": getattr(item, "total_price_product", None)
-            }
-            for item in getattr(cart, "items", [])
-        ],
-        "total": getattr(cart, "total", None),
-        "sum": getattr(cart, "sum", None)
-    }
+from app.shemas import Cart, CartItemCreate, CartItemUpserted, CartReservation, CartAvailability
+from app.serialization import json_response
 from app.services.cart import CartService
+from app.services.reservations import ReservationService
+from app.idempotency import Idempotency, get_idempotency
 
 router = APIRouter(
     prefix="/carts",
@@ -46,6 +22,11 @@ def get_cart_service(db: AsyncSession = Depends(get_async_db)) -> CartService:
     return CartService(db)
 
 
+def get_reservation_service(db: AsyncSession = Depends(get_async_db)) -> ReservationService:
+    """Зависимость для получения сервиса резервирования"""
+    return ReservationService(db)
+
+
 @router.get('/', response_model=Cart)
 async def get_user_cart(
     user: Annotated[UserModel, Depends(get_current_buyer)],
@@ -55,7 +36,7 @@ async def get_user_cart(
     Просмотр всех активных товаров в корзине
     """
     cart = await cart_service.get_user_cart(user)
-    return Cart.model_validate(cart_to_dict(cart))#cart#Cart.model_validate(cart)
+    return json_response(Cart, cart)
 
 
 @router.get('/summary')
@@ -79,21 +60,44 @@ async def get_user_cart_del(
     Просмотр удаленных товаров из корзины
     """
     cart = await cart_service.get_user_cart(user, include_inactive=True)
-    return Cart.model_validate(cart_to_dict(cart))
+    return json_response(Cart, cart)
 
 
-@router.post('/items', response_model=CartItems)
+@router.post('/items', response_model=CartItemUpserted)
 async def add_items_cart(
     user: Annotated[UserModel, Depends(get_current_buyer)],
     items: CartItemCreate,
+    idempotency: Annotated[Idempotency, Depends(get_idempotency)],
     cart_service: CartService = Depends(get_cart_service)
 ):
     """
-    Добавление товаров в корзину
+    Добавление товаров в корзину. Возвращает изменённую позицию из RETURNING апсерта,
+    полную корзину отдаёт GET /carts/. Поддерживает Idempotency-Key
     """
-    await cart_service.add_item_to_cart(user, items)
-    cart = await cart_service.get_user_cart(user)
-    return Cart.model_validate(cart_to_dict(cart))
+    async def add():
+        cart_item = await cart_service.add_item_to_cart(user, items)
+        return json_response(CartItemUpserted, cart_item)
+
+    return await idempotency.run(user.id, add)
+
+
+@router.post('/items/batch', response_model=Cart)
+async def add_items_cart_batch(
+    user: Annotated[UserModel, Depends(get_current_buyer)],
+    items: Annotated[list[CartItemCreate], Body(min_length=1, max_length=1000)],
+    idempotency: Annotated[Idempotency, Depends(get_idempotency)],
+    cart_service: CartService = Depends(get_cart_service)
+):
+    """
+    Пакетное добавление товаров в корзину (повтор заказа, перенос из вишлиста).
+    Поддерживает Idempotency-Key
+    """
+    async def add():
+        await cart_service.add_items_to_cart(user, items)
+        cart = await cart_service.get_user_cart(user)
+        return json_response(Cart, cart)
+
+    return await idempotency.run(user.id, add)
 
 
 @router.delete('/items/{item_id}')
@@ -131,7 +135,43 @@ async def update_quantity_product(
     Добавить или уменьшить количество товаров
     """
     cart = await cart_service.update_item_quantity(user, item_id, count)
-    return Cart.model_validate(cart_to_dict(cart))
+    return json_response(Cart, cart)
+
+
+@router.get('/availability', response_model=CartAvailability)
+async def get_cart_availability(
+    user: Annotated[UserModel, Depends(get_current_buyer)],
+    reservation_service: ReservationService = Depends(get_reservation_service)
+):
+    """
+    Доступность товаров корзины с учётом резервов других покупателей
+    """
+    availability = await reservation_service.get_cart_availability(user)
+    return json_response(CartAvailability, availability)
+
+
+@router.post('/reservation', response_model=CartReservation, status_code=status.HTTP_201_CREATED)
+async def reserve_cart(
+    user: Annotated[UserModel, Depends(get_current_buyer)],
+    idempotency: Annotated[Idempotency, Depends(get_idempotency)],
+    reservation_service: ReservationService = Depends(get_reservation_service)
+):
+    """
+    Зарезервировать товары корзины перед оплатой. Поддерживает Idempotency-Key
+    """
+    async def reserve():
+        reservation = await reservation_service.reserve_cart(user)
+        return json_response(CartReservation, reservation, status_code=status.HTTP_201_CREATED)
 
+    return await idempotency.run(user.id, reserve)
 
 
+@router.delete('/reservation')
+async def release_cart_reservation(
+    user: Annotated[UserModel, Depends(get_current_buyer)],
+    reservation_service: ReservationService = Depends(get_reservation_service)
+):
+    """
+    Снять резерв товаров корзины
+    """
+    return await reservation_service.release_cart(user)
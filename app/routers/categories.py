@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
 from typing import Annotated
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.db_depends import get_async_db
-from app.shemas import Category as CategorySchema, CategoryCreate
+from app.shemas import Category as CategorySchema, CategoryCreate, CategoryTreeNode
 from app.services.categories import CategoryService
+from app.http_cache import etag_matches, not_modified
 
 router = APIRouter(
     prefix="/categories",
@@ -30,12 +31,32 @@ async def create_category(
 
 @router.get("/", response_model=list[CategorySchema])
 async def get_all_categories(
+    request: Request,
+    response: Response,
     category_service: CategoryService = Depends(get_category_service)
 ):
     """
-    Возвращает список всех активных категорий.
+    Возвращает список всех активных категорий. Поддерживает If-None-Match.
     """
-    return await category_service.get_all_categories()
+    snapshot = await category_service.get_all_categories()
+    if etag_matches(request, snapshot.etag):
+        return not_modified(snapshot.etag)
+    response.headers["ETag"] = snapshot.etag
+    return snapshot.categories
+
+
+@router.get("/tree", response_model=list[CategoryTreeNode])
+async def get_category_tree(
+    request: Request,
+    category_service: CategoryService = Depends(get_category_service)
+):
+    """
+    Возвращает вложенное дерево активных категорий. Поддерживает If-None-Match.
+    """
+    tree = await category_service.get_category_tree()
+    if etag_matches(request, tree.etag):
+        return not_modified(tree.etag)
+    return Response(content=tree.body, media_type="application/json", headers={"ETag": tree.etag})
 
 
 @router.delete("/{category_id}", response_model=CategorySchema)
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import Annotated, Literal
+
+from app.auth import get_current_admin
+from app.models.users import User as UserModel
+from app.services.export import ExportService
+
+router = APIRouter(
+    prefix="/export",
+    tags=["Export"],
+)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+ExportFormat = Annotated[Literal["ndjson", "csv"], Query(description="Формат выгрузки: ndjson или csv")]
+
+
+def get_export_service() -> ExportService:
+    """Зависимость для получения сервиса выгрузки"""
+    return ExportService()
+
+
+def _streaming_response(chunks, name: str, fmt: str) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+@router.get("/products")
+async def export_products(
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+    format: ExportFormat = "ndjson",
+    export_service: ExportService = Depends(get_export_service)
+):
+    """
+    Потоковая выгрузка всех активных товаров (только для администраторов).
+    """
+    return _streaming_response(export_service.products(format), "products", format)
+
+
+@router.get("/reviews")
+async def export_reviews(
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+    format: ExportFormat = "ndjson",
+    export_service: ExportService = Depends(get_export_service)
+):
+    """
+    Потоковая выгрузка всех активных отзывов (только для администраторов).
+    """
+    return _streaming_response(export_service.reviews(format), "reviews", format)
+
+
+@router.get("/orders")
+async def export_orders(
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+    format: ExportFormat = "ndjson",
+    export_service: ExportService = Depends(get_export_service)
+):
+    """
+    Потоковая выгрузка всех заказов (только для администраторов).
+    """
+    return _streaming_response(export_service.orders(format), "orders", format)
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from typing import Annotated
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_buyer
 from app.services.order import OrderServics
-from app.shemas import OrderOut, OrderCreate, OrderItemOut
+from app.shemas import OrderOut, OrderCreate, OrderItemOut, OrderPage
 from app.database.db_depends import get_async_db
 from app.shemas import User
+from app.http_cache import etag_matches, not_modified
+from app.serialization import json_response
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.idempotency import Idempotency, get_idempotency
 
 router = APIRouter(
     prefix="/orders",
@@ -19,29 +23,48 @@ async def get_order_service(db: AsyncSession = Depends(get_async_db)) -> OrderSe
     """
     return OrderServics(db)
 
-@router.get("/", response_model=list[OrderOut])
+@router.get("/", response_model=OrderPage)
 async def list_orders(
     user: Annotated[User, Depends(get_current_buyer)],
-    order_servics: Annotated[OrderServics, Depends(get_order_service)]
+    order_servics: Annotated[OrderServics, Depends(get_order_service)],
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+):
+    '''
+    Вернуть страницу заказов (без позиций), от новых к старым
+    '''
+    order_page = await order_servics.get_list(user, limit, after)
+    return json_response(OrderPage, order_page)
+
+
+@router.get("/{order_id}/items", response_model=list[OrderItemOut])
+async def get_order_items(
+    order_id: int,
+    order_servics: Annotated[OrderServics, Depends(get_order_service)],
+    user: Annotated[User, Depends(get_current_buyer)],
 ):
     '''
-    Вернуть список заказов
+    Вернуть позиции заказа
     '''
-    order = await order_servics.get_list(user)
-    return [OrderOut.model_validate(order) for order in order]
+    items = await order_servics.get_items(user, order_id)
+    return json_response(list[OrderItemOut], items)
 
 
 @router.get("/{order_id}", response_model=OrderOut)
 async def get_order_id(
     order_id: int,
+    request: Request,
     order_servics: Annotated[OrderServics, Depends(get_order_service)],
     user: Annotated[User, Depends(get_current_buyer)],
 ):
     '''
-    Вернуть конкретный товар из заказа
+    Вернуть конкретный товар из заказа. Поддерживает If-None-Match
     '''
+    etag = await order_servics.get_order_etag(user, order_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
     order = await order_servics.get_id(user, order_id)
-    return OrderOut.model_validate(order)
+    return json_response(OrderOut, order, headers={"ETag": etag})
 
 
 
@@ -50,11 +73,15 @@ async def checkout_order(
     
     order_servics: Annotated[OrderServics, Depends(get_order_service)],
     user: Annotated[User, Depends(get_current_buyer)],
+    idempotency: Annotated[Idempotency, Depends(get_idempotency)],
 ):
     '''
-    Создать заказ
+    Создать заказ. Повтор с тем же заголовком Idempotency-Key возвращает уже созданный заказ
     '''
-    db_order = await order_servics.checkout_order(user)
-    return OrderOut.model_validate(db_order)
+    async def checkout():
+        db_order = await order_servics.checkout_order(user)
+        return json_response(OrderOut, db_order, status_code=status.HTTP_201_CREATED)
+
+    return await idempotency.run(user.id, checkout)
 
 
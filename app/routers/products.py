@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, status
-from typing import Annotated
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from typing import Annotated, Literal
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.db_depends import get_async_db
 from app.auth import get_current_seller
 from app.models.users import User as UserModel
-from app.shemas import Product as ProductSchema, ProductCreate, Review as ReviewShemas
+from app.shemas import (
+    Product as ProductSchema, ProductCreate, ProductBatchUpdateItem, ProductPage, ProductFilter,
+    ProductImportReport, ProductDetail, RatingHistogram, ReviewPage
+)
 from app.services.products import ProductService
+from app.services.product_import import ProductImportService
+from app.services.reviews import ReviewService
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.http_cache import etag_matches, not_modified
+from app.routers.reviews import get_review_service
 
 router = APIRouter(
     prefix="/products",
@@ -31,36 +39,121 @@ async def create_product(
     return await product_service.create_product(product, current_user)
 
 
-@router.get("/", response_model=list[ProductSchema])
+def get_product_import_service(db: AsyncSession = Depends(get_async_db)) -> ProductImportService:
+    """Зависимость для получения сервиса импорта товаров"""
+    return ProductImportService(db)
+
+
+@router.post("/import", response_model=ProductImportReport)
+async def import_products(
+    current_user: Annotated[UserModel, Depends(get_current_seller)],
+    file: UploadFile = File(..., description="CSV с заголовком или NDJSON со строками ProductCreate"),
+    format: Literal["csv", "ndjson"] | None = Query(None, description="Формат файла; по умолчанию определяется по расширению"),
+    import_service: ProductImportService = Depends(get_product_import_service)
+):
+    """
+    Массово создаёт товары текущего продавца из файла и возвращает отчёт по строкам (только для 'seller').
+    """
+    if format is None:
+        filename = (file.filename or "").lower()
+        if filename.endswith(".csv"):
+            format = "csv"
+        elif filename.endswith((".ndjson", ".jsonl")):
+            format = "ndjson"
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot detect file format, pass format=csv or format=ndjson"
+            )
+    content = await file.read()
+    return await import_service.import_products(content, format, current_user)
+
+
+@router.patch("/batch", response_model=list[ProductSchema])
+async def batch_update_products(
+    items: Annotated[list[ProductBatchUpdateItem], Body(min_length=1, max_length=50_000)],
+    current_user: Annotated[UserModel, Depends(get_current_seller)],
+    product_service: ProductService = Depends(get_product_service)
+):
+    """
+    Пакетно обновляет цену и/или остаток товаров текущего продавца (только для 'seller').
+    Чужие, неактивные и неизменившиеся товары пропускаются; возвращаются изменённые.
+    """
+    return await product_service.batch_update_products(items, current_user)
+
+
+@router.get("/", response_model=ProductPage)
 async def get_all_products(
+    filters: Annotated[ProductFilter, Depends()],
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    facets: bool = Query(False, description="Посчитать фасеты по цене и рейтингу"),
     product_service: ProductService = Depends(get_product_service)
 ):
     """
-    Возвращает список всех активных товаров.
+    Возвращает страницу активных товаров с фильтрами, сортировкой и фасетами.
     """
-    return await product_service.get_all_products()
+    return await product_service.get_all_products(filters, limit, after, facets)
 
 
-@router.get("/category/{category_id}", response_model=list[ProductSchema])
+@router.get("/category/{category_id}", response_model=ProductPage)
 async def get_products_by_category(
     category_id: int,
+    filters: Annotated[ProductFilter, Depends()],
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    facets: bool = Query(False, description="Посчитать фасеты по цене и рейтингу"),
+    include_descendants: bool = Query(False, description="Включить товары всех подкатегорий"),
     product_service: ProductService = Depends(get_product_service)
 ):
     """
-    Возвращает список активных товаров в указанной категории по её ID.
+    Возвращает страницу активных товаров в указанной категории по её ID с фильтрами и фасетами.
     """
-    return await product_service.get_products_by_category(category_id)
+    return await product_service.get_products_by_category(
+        category_id, filters, limit, after, facets, include_descendants
+    )
 
 
-@router.get("/{product_id}", response_model=ProductSchema)
+@router.get("/search", response_model=ProductPage)
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    product_service: ProductService = Depends(get_product_service)
+):
+    """
+    Полнотекстовый поиск товаров по названию и описанию, отсортированный по релевантности.
+    """
+    return await product_service.search_products(q, limit, after)
+
+
+@router.get("/ratings/histogram", response_model=list[RatingHistogram])
+async def get_rating_histograms(
+    ids: Annotated[list[int], Query(min_length=1, max_length=MAX_PAGE_SIZE)],
+    product_service: ProductService = Depends(get_product_service)
+):
+    """
+    Распределения оценок для нескольких товаров (?ids=1&ids=2...), например для страницы списка.
+    """
+    return await product_service.get_rating_histograms(ids)
+
+
+@router.get("/{product_id}", response_model=ProductDetail)
 async def get_product(
     product_id: int,
+    request: Request,
+    response: Response,
     product_service: ProductService = Depends(get_product_service)
 ):
     """
-    Возвращает детальную информацию о товаре по его ID.
+    Возвращает детальную информацию о товаре по его ID вместе с распределением оценок.
+    Поддерживает If-None-Match.
     """
-    return await product_service.get_product(product_id)
+    snapshot = await product_service.get_product(product_id)
+    if etag_matches(request, snapshot.etag):
+        return not_modified(snapshot.etag)
+    response.headers["ETag"] = snapshot.etag
+    return snapshot.product
 
 
 @router.put("/{product_id}", response_model=ProductSchema)
@@ -88,12 +181,20 @@ async def delete_product(
     return await product_service.delete_product(product_id, current_user)
 
 
-@router.get('/{product_id}/reviews/', response_model=list[ReviewShemas])
+@router.get('/{product_id}/reviews/', response_model=ReviewPage)
 async def get_product_reviews(
     product_id: int,
-    product_service: ProductService = Depends(get_product_service)
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    review_service: ReviewService = Depends(get_review_service)
 ):
     """
-    Возвращает активные отзывы для продукта.
+    Возвращает страницу активных отзывов для продукта, от новых к старым. Поддерживает If-None-Match.
     """
-    return await product_service.get_product_reviews(product_id)
\ No newline at end of file
+    etag = await review_service.get_product_reviews_etag(product_id, request.url.query)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return await review_service.get_product_reviews(product_id, limit, after)
\ No newline at end of file
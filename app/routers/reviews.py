@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
 from typing import Annotated
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.db_depends import get_async_db
 from app.auth import get_current_buyer, get_current_admin
 from app.models.users import User as UserModel
-from app.shemas import Review as ReviewSchema, CreateReview
+from app.shemas import (
+    Review as ReviewSchema, ReviewPage, CreateReview, RatingMismatch, ReviewModeration, ReviewModerationResult
+)
 from app.services.reviews import ReviewService
+from app.http_cache import etag_matches, not_modified
+from app.serialization import json_response
+from app.idempotency import Idempotency, get_idempotency
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter(
     prefix='/reviews',
@@ -19,26 +25,60 @@ def get_review_service(db: AsyncSession = Depends(get_async_db)) -> ReviewServic
     return ReviewService(db)
 
 
-@router.get('/', response_model=list[ReviewSchema], status_code=status.HTTP_200_OK)
+@router.get('/', response_model=ReviewPage, status_code=status.HTTP_200_OK)
 async def get_all_reviews(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
     review_service: ReviewService = Depends(get_review_service)
 ):
     """
-    Возвращает список всех активных отзывов.
+    Возвращает страницу всех активных отзывов, от новых к старым.
     """
-    return await review_service.get_all_reviews()
+    return await review_service.get_all_reviews(limit, after)
 
 
 @router.post('/', response_model=ReviewSchema, status_code=status.HTTP_201_CREATED)
 async def create_review(
     review: CreateReview,
     current_user: Annotated[UserModel, Depends(get_current_buyer)],
+    idempotency: Annotated[Idempotency, Depends(get_idempotency)],
+    review_service: ReviewService = Depends(get_review_service)
+):
+    """
+    Создаёт новый отзыв для продукта. Поддерживает Idempotency-Key.
+    """
+    async def create():
+        db_review = await review_service.create_review(review, current_user)
+        return json_response(ReviewSchema, db_review, status_code=status.HTTP_201_CREATED)
+
+    return await idempotency.run(current_user.id, create)
+
+
+@router.post('/moderation', response_model=ReviewModerationResult)
+async def moderate_reviews(
+    moderation: ReviewModeration,
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+    review_service: ReviewService = Depends(get_review_service)
+):
+    """
+    Массово снимает отзывы по списку id и/или автору и пересчитывает рейтинги
+    затронутых товаров (только для администраторов).
+    """
+    return await review_service.moderate_reviews(moderation)
+
+
+@router.get('/rating-consistency', response_model=list[RatingMismatch])
+async def check_rating_consistency(
+    current_user: Annotated[UserModel, Depends(get_current_admin)],
+    limit: int = Query(100, ge=1, le=1000),
     review_service: ReviewService = Depends(get_review_service)
 ):
     """
-    Создаёт новый отзыв для продукта.
+    Товары, у которых rating_sum/rating_count не совпадают с активными отзывами
+    (только для администраторов).
     """
-    return await review_service.create_review(review, current_user)
+    mismatches = await review_service.check_rating_consistency(limit)
+    return json_response(list[RatingMismatch], mismatches)
 
 
 @router.delete('/{review_id}', status_code=status.HTTP_200_OK)
@@ -53,23 +93,34 @@ async def delete_review(
     return await review_service.delete_review(review_id)
 
 
-@router.get('/product/{product_id}', response_model=list[ReviewSchema])
+@router.get('/product/{product_id}', response_model=ReviewPage)
 async def get_product_reviews(
     product_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
     review_service: ReviewService = Depends(get_review_service)
 ):
     """
-    Возвращает все активные отзывы для указанного продукта.
+    Возвращает страницу активных отзывов для указанного продукта, от новых к старым.
+    Поддерживает If-None-Match.
     """
-    return await review_service.get_product_reviews(product_id)
+    etag = await review_service.get_product_reviews_etag(product_id, request.url.query)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return await review_service.get_product_reviews(product_id, limit, after)
 
 
-@router.get('/user/{user_id}', response_model=list[ReviewSchema])
+@router.get('/user/{user_id}', response_model=ReviewPage)
 async def get_user_reviews(
     user_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
     review_service: ReviewService = Depends(get_review_service)
 ):
     """
-    Возвращает все отзывы указанного пользователя.
+    Возвращает страницу активных отзывов указанного пользователя, от новых к старым.
     """
-    return await review_service.get_user_reviews(user_id)
\ No newline at end of file
+    return await review_service.get_user_reviews(user_id, limit, after)
\ No newline at end of file
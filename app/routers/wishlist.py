@@ -7,6 +7,7 @@ from app.shemas import Wishlist, WishlistItem
 from app.database.db_depends import get_async_db
 from app.auth import get_current_buyer
 from app.services.wishlist import WishlistService
+from app.serialization import json_response
 
 router = APIRouter(prefix='/wishlist', tags=['Wishlist'])
 
@@ -27,7 +28,7 @@ async def get_wishlist(
     Получить вишлист текущего пользователя
     """
     wishlist = await wishlist_service.get_wishlist_with_items(user)
-    return Wishlist.model_validate(wishlist) 
+    return json_response(Wishlist, wishlist)
 
 
 @router.get('/quantity')
@@ -52,7 +53,7 @@ async def add_product_to_wishlist(
     Добавить товар в вишлист
     """
     wislist = await wishlist_service.add_product_to_wishlist(user, product_id)
-    return WishlistItem.model_validate(wislist)
+    return json_response(WishlistItem, wislist)
 
 
 @router.delete('/{wishlist_item_id}', response_model=WishlistItem)
@@ -0,0 +1,30 @@
+from functools import lru_cache
+
+from fastapi import Response, status
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def get_adapter(schema) -> TypeAdapter:
+    """
+    Возвращает закэшированный TypeAdapter для схемы (модели или list[Model]).
+    Построение валидатора дорогое, поэтому делается один раз на тип.
+    """
+    return TypeAdapter(schema)
+
+
+def json_response(schema, obj, status_code: int = status.HTTP_200_OK, headers: dict | None = None) -> Response:
+    """
+    Однократно валидирует ORM-объект (from_attributes) и сразу кодирует его в JSON.
+
+    Возвращённый Response FastAPI отдаёт как есть, поэтому response_model в маршруте
+    остаётся только для документации и повторной валидации не происходит.
+    """
+    adapter = get_adapter(schema)
+    value = adapter.validate_python(obj, from_attributes=True)
+    return Response(
+        content=adapter.dump_json(value),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
@@ -1,4 +1,5 @@
-from sqlalchemy import select, update
+from sqlalchemy import select, update, literal, any_, func, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload, with_loader_criteria
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
@@ -8,17 +9,42 @@ from app.models.products import Product
 from app.models.categories import Category
 from app.models.users import User as UserModel
 from app.shemas import CartItemCreate
+from app.services.cart_store import cart_store, DirectCartStore
+
+
+def build_upsert_item_statement(user_id: int, product_id: int, quantity: int):
+    """
+    INSERT ... SELECT ... ON CONFLICT для одной позиции корзины.
+    Корзина подставляется скалярным подзапросом, а не второй таблицей во FROM,
+    поэтому строка не вставляется, если корзины нет или товар не найден/неактивен.
+    """
+    cart_id = select(CartModel.id).where(CartModel.user_id == user_id).scalar_subquery()
+    insert_stmt = pg_insert(CartItemModel).from_select(
+        ["cart_id", "product_id", "quantity"],
+        select(cart_id, Product.id, literal(quantity))
+        .where(
+            Product.id == product_id,
+            Product.is_active == True,
+            cart_id.is_not(None)
+        )
+    )
+    return insert_stmt.on_conflict_do_update(
+        index_elements=[CartItemModel.cart_id, CartItemModel.product_id],
+        index_where=CartItemModel.is_active,
+        set_={"quantity": CartItemModel.quantity + insert_stmt.excluded.quantity}
+    ).returning(CartItemModel)
 
 
 class CartService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, store: DirectCartStore = cart_store):
         self.db = db
+        self.store = store
 
     async def get_user_cart(self, user: UserModel, include_inactive: bool = False):
         """
         Получение корзины пользователя
         """
-        cart_model = await self.db.scalar(
+        stmt = (
             select(CartModel)
             .options(
                 selectinload(CartModel.items)
@@ -30,83 +56,162 @@ class CartService:
             )
             .where(CartModel.user_id == user.id)
         )
+        if self.store.buffered:
+            # Объекты в сессии могут уже нести наложенные изменения: перечитываем из БД и накладываем заново
+            stmt = stmt.execution_options(populate_existing=True)
+        cart_model = await self.db.scalar(stmt)
 
         if not cart_model:
-            cart_model = await self._create_cart(user)
+            await self._get_or_create_cart(user)
+            cart_model = await self.db.scalar(stmt)
 
+        if not include_inactive:
+            self.store.overlay(cart_model)
         return cart_model
 
     async def get_cart_summary(self, user: UserModel):
         """
-        Получение сводки по корзине
+        Получение сводки по корзине одним агрегирующим запросом
         """
-        cart = await self.db.scalar(
-            select(CartModel)
-            .options(selectinload(CartModel.items).
-                     selectinload(CartItemModel.product))
+        await self._flush_user_cart(user)
+        summary = (await self.db.execute(
+            select(
+                func.count(CartItemModel.id).label("positions"),
+                func.coalesce(func.sum(CartItemModel.quantity), 0).label("total_items"),
+                func.coalesce(func.sum(CartItemModel.quantity * Product.price), 0.0).label("total_price"),
+            )
+            .select_from(CartModel)
+            .outerjoin(CartItemModel, and_(
+                CartItemModel.cart_id == CartModel.id,
+                CartItemModel.is_active == True
+            ))
+            .outerjoin(Product, Product.id == CartItemModel.product_id)
             .where(CartModel.user_id == user.id)
-        )
+            .group_by(CartModel.id)
+        )).first()
         
-        if not cart:
+        if not summary:
             raise HTTPException(status_code=404, detail="Корзина не найдена")
-            
-        total_items = sum(item.quantity for item in cart.items if item.is_active)
-        total_price = sum(item.product.price * item.quantity for item in cart.items if item.is_active)
 
         return {
-            "total_items": total_items,
-            "total_price": total_price,
+            "total_items": summary.total_items,
+            "total_price": summary.total_price,
+            "positions": summary.positions,
             "currency": "RUB"
         }
 
     async def add_item_to_cart(self, user: UserModel, item_data: CartItemCreate):
         """
-        Добавление товара в корзину
+        Добавление товара в корзину.
+        Проверка товара, поиск корзины и вставка/увеличение количества выполняются
+        одним INSERT ... SELECT ... ON CONFLICT по уникальному индексу активных позиций.
+        В буферизующем режиме прибавка к уже существующей позиции копится в памяти.
         """
-        cart = await self._get_or_create_cart(user)
+        if self.store.buffered:
+            cart_item = await self._find_active_item(user, item_data.product_id)
+            if cart_item is not None and not self.store.is_removed(cart_item):
+                await self.store.adjust(self.db, cart_item, item_data.quantity)
+                return cart_item
+            if cart_item is not None:
+                # Удаление ещё не сброшено: сначала сбрасываем, чтобы вставка создала новую позицию
+                await self.store.flush(self.db, cart_item.cart_id)
 
-        # Проверяем существование товара
-        product = await self.db.scalar(
-            select(Product).where(Product.id == item_data.product_id, Product.is_active == True)
-        )
-        if not product:
+        cart_item = await self._upsert_item(user, item_data.product_id, item_data.quantity)
+        if cart_item is None:
+            # Корзины ещё нет или товар не найден: корзину создаём только для существующего товара
+            product_id = await self.db.scalar(
+                select(Product.id).where(Product.id == item_data.product_id, Product.is_active == True)
+            )
+            if product_id is None:
+                await self.db.rollback()
+                raise HTTPException(status_code=404, detail="Товар не найден")
+            await self._get_or_create_cart(user)
+            cart_item = await self._upsert_item(user, item_data.product_id, item_data.quantity)
+        if cart_item is None:
+            await self.db.rollback()
             raise HTTPException(status_code=404, detail="Товар не найден")
 
-        # Проверяем, есть ли уже такой товар в корзине
-        cart_item = await self.db.scalar(
-            select(CartItemModel)
-            .where(
-                CartItemModel.cart_id == cart.id,
-                CartItemModel.product_id == item_data.product_id,
-                CartItemModel.is_active == True
-            )
-        )
+        await self.db.commit()
+        return cart_item
 
-        if cart_item:
-            cart_item.quantity += item_data.quantity
-        else:
-            cart_item = CartItemModel(**item_data.model_dump(), cart_id=cart.id)
-            self.db.add(cart_item)
+    async def add_items_to_cart(self, user: UserModel, items: list[CartItemCreate]):
+        """
+        Пакетное добавление товаров в корзину.
+        Все товары проверяются одним запросом WHERE id = ANY(...), затем позиции
+        вставляются/увеличиваются одним многострочным INSERT ... ON CONFLICT.
+        """
+        # Один товар может встречаться несколько раз: ON CONFLICT не обновит строку дважды
+        quantities: dict[int, int] = {}
+        for item in items:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
 
+        found = set(await self.db.scalars(
+            select(Product.id).where(
+                Product.id == any_(list(quantities)),
+                Product.is_active == True
+            )
+        ))
+        missing = sorted(set(quantities) - found)
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Товары не найдены: {missing}"
+            )
+
+        cart = await self._get_or_create_cart(user)
+        await self.store.flush(self.db, cart.id)
+        insert_stmt = pg_insert(CartItemModel).values([
+            {"cart_id": cart.id, "product_id": product_id, "quantity": quantity}
+            for product_id, quantity in quantities.items()
+        ])
+        await self.db.execute(
+            insert_stmt.on_conflict_do_update(
+                index_elements=[CartItemModel.cart_id, CartItemModel.product_id],
+                index_where=CartItemModel.is_active,
+                set_={"quantity": CartItemModel.quantity + insert_stmt.excluded.quantity}
+            )
+        )
         await self.db.commit()
-        await self.db.refresh(cart_item)
 
-        # Подгружаем связанные данные
-        result = await self.db.execute(
+    async def _upsert_item(self, user: UserModel, product_id: int, quantity: int):
+        """
+        Вставляет позицию или прибавляет количество к существующей активной позиции.
+        Возвращает None, если у пользователя нет корзины или товар не найден/неактивен.
+        """
+        stmt = build_upsert_item_statement(user.id, product_id, quantity)
+        return await self.db.scalar(stmt)
+
+    async def _find_active_item(self, user: UserModel, product_id: int):
+        """
+        Активная позиция корзины пользователя с активным товаром или None
+        """
+        return await self.db.scalar(
             select(CartItemModel)
-            .options(selectinload(CartItemModel.product))
-            .where(CartItemModel.id == cart_item.id)
+            .join(CartModel, CartModel.id == CartItemModel.cart_id)
+            .join(Product, Product.id == CartItemModel.product_id)
+            .where(
+                CartModel.user_id == user.id,
+                CartItemModel.product_id == product_id,
+                CartItemModel.is_active == True,
+                Product.is_active == True
+            )
         )
-        return result.scalar_one()
+
+    async def _flush_user_cart(self, user: UserModel) -> None:
+        """
+        Сбрасывает в БД накопленные изменения корзины пользователя перед чтением агрегатов
+        """
+        if self.store.buffered:
+            cart_id = await self.db.scalar(select(CartModel.id).where(CartModel.user_id == user.id))
+            if cart_id is not None:
+                await self.store.flush(self.db, cart_id)
 
     async def remove_item(self, user: UserModel, item_id: int):
         """
         Удаление товара из корзины
         """
         cart_item = await self._check_cart_item(user, item_id)
-        cart_item.is_active = False
-        await self.db.commit()
-        await self.db.refresh(cart_item)
+        await self.store.remove(self.db, cart_item)
         return cart_item
 
     async def clear_cart(self, user: UserModel):
@@ -114,6 +219,7 @@ class CartService:
         Очистка корзины
         """
         cart = await self._get_or_create_cart(user)
+        self.store.discard(cart.id)
 
         await self.db.execute(
             update(CartItemModel)
@@ -128,33 +234,39 @@ class CartService:
         Обновление количества товара
         """
         cart_item = await self._check_cart_item(user, item_id)
-        cart_item.quantity += count
+        quantity = cart_item.quantity + self.store.pending_delta(cart_item) + count
         
-        if cart_item.quantity < 0:
+        if quantity < 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Количество не может быть меньше нуля: {cart_item.quantity}"
+                detail=f"Количество не может быть меньше нуля: {quantity}"
             )
 
-        await self.db.commit()
-        await self.db.refresh(cart_item)
+        await self.store.adjust(self.db, cart_item, count)
 
         # Возвращаем обновленную корзину
         return await self.get_user_cart(user)
 
     async def _get_or_create_cart(self, user: UserModel):
         """
-        Получение или создание корзины
+        Получение или создание корзины.
+        Создание идёт через ON CONFLICT DO NOTHING, поэтому параллельные запросы
+        не падают на уникальности user_id.
         """
         cart = await self.db.scalar(
             select(CartModel).where(CartModel.user_id == user.id)
         )
         
         if not cart:
-            cart = CartModel(user_id=user.id)
-            self.db.add(cart)
+            await self.db.execute(
+                pg_insert(CartModel)
+                .values(user_id=user.id, is_active=True)
+                .on_conflict_do_nothing(index_elements=[CartModel.user_id])
+            )
             await self.db.commit()
-            await self.db.refresh(cart)
+            cart = await self.db.scalar(
+                select(CartModel).where(CartModel.user_id == user.id)
+            )
             
         return cart
 
@@ -173,20 +285,10 @@ class CartService:
             )
         )
         
-        if not cart_item:
+        if not cart_item or self.store.is_removed(cart_item):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Товар не найден в корзине"
             )
             
         return cart_item
-
-    async def _create_cart(self, user: UserModel):
-        """
-        Создание новой корзины
-        """
-        cart = CartModel(user_id=user.id)
-        self.db.add(cart)
-        await self.db.commit()
-        await self.db.refresh(cart)
-        return cart
\ No newline at end of file
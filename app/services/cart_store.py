@@ -0,0 +1,223 @@
+"""
+Хранилища мутаций корзины.
+
+direct (по умолчанию)
+    Каждое изменение количества и удаление позиции коммитится в БД до ответа клиенту.
+    Подтверждённое изменение переживает падение процесса.
+
+memory (write-behind)
+    Изменения количества и удаления существующих позиций копятся в памяти процесса
+    и схлопываются по (cart_id, product_id): десять кликов «+1» превращаются в одно «+10».
+    Накопленное сбрасывается в cart_items одним UPDATE ... FROM (VALUES ...) фоновой задачей
+    раз в CART_FLUSH_INTERVAL секунд, при превышении CART_FLUSH_MAX_PENDING позиций,
+    при штатной остановке приложения и перед операциями, которым нужно точное состояние
+    в БД (оформление заказа, сводка корзины, пакетное добавление, очистка).
+    Гарантии:
+      * при падении процесса теряются изменения не старше CART_FLUSH_INTERVAL секунд;
+      * новая позиция (товара ещё нет в корзине) пишется в БД сразу, чтобы у неё был id;
+      * чтение корзины накладывает несброшенные изменения на данные из БД;
+      * состояние локально для процесса, поэтому при нескольких воркерах запросы
+        одного пользователя должны попадать в один процесс (sticky-маршрутизация),
+        иначе другой воркер увидит корзину на момент последнего сброса.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from sqlalchemy import update, values, column, not_, Integer, Boolean
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config import CART_STORE, CART_FLUSH_INTERVAL, CART_FLUSH_MAX_PENDING
+from app.database.database import async_session_maker
+from app.models.cart import CartItem as CartItemModel, Cart as CartModel
+
+
+logger = logging.getLogger(__name__)
+
+# Строк в одном UPDATE ... FROM (VALUES ...): 4 параметра на строку при лимите 32767 у asyncpg
+FLUSH_CHUNK = 5000
+
+
+class DirectCartStore:
+    """
+    Мутации сразу пишутся в БД и коммитятся.
+    """
+    buffered = False
+
+    async def adjust(self, db: AsyncSession, cart_item: CartItemModel, delta: int) -> None:
+        cart_item.quantity += delta
+        await db.commit()
+        await db.refresh(cart_item)
+
+    async def remove(self, db: AsyncSession, cart_item: CartItemModel) -> None:
+        cart_item.is_active = False
+        await db.commit()
+        await db.refresh(cart_item)
+
+    def pending_delta(self, cart_item: CartItemModel) -> int:
+        return 0
+
+    def is_removed(self, cart_item: CartItemModel) -> bool:
+        return False
+
+    def overlay(self, cart: CartModel) -> None:
+        pass
+
+    def discard(self, cart_id: int) -> None:
+        pass
+
+    async def flush(self, db: AsyncSession, cart_id: int | None = None) -> None:
+        pass
+
+
+@dataclass
+class PendingLine:
+    """Несброшенное изменение позиции: суммарная дельта количества и признак удаления"""
+    delta: int = 0
+    removed: bool = False
+
+
+class MemoryCartStore(DirectCartStore):
+    """
+    Write-behind хранилище: копит изменения в памяти и сбрасывает их пачками.
+    """
+    buffered = True
+
+    def __init__(self, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: dict[int, dict[int, PendingLine]] = {}
+        self._size = 0
+
+    async def adjust(self, db: AsyncSession, cart_item: CartItemModel, delta: int) -> None:
+        self._line(cart_item).delta += delta
+        set_committed_value(cart_item, "quantity", cart_item.quantity + delta)
+        await self._flush_if_full(db)
+
+    async def remove(self, db: AsyncSession, cart_item: CartItemModel) -> None:
+        line = self._line(cart_item)
+        line.removed = True
+        line.delta = 0
+        set_committed_value(cart_item, "is_active", False)
+        await self._flush_if_full(db)
+
+    def pending_delta(self, cart_item: CartItemModel) -> int:
+        line = self._pending.get(cart_item.cart_id, {}).get(cart_item.product_id)
+        return line.delta if line else 0
+
+    def is_removed(self, cart_item: CartItemModel) -> bool:
+        line = self._pending.get(cart_item.cart_id, {}).get(cart_item.product_id)
+        return bool(line and line.removed)
+
+    def overlay(self, cart: CartModel) -> None:
+        """
+        Накладывает несброшенные изменения на загруженную корзину с активными позициями.
+        Значения выставляются как «загруженные из БД», поэтому сессия не считает объекты изменёнными.
+        """
+        pending = self._pending.get(cart.id)
+        if not pending:
+            return
+        items = []
+        for item in cart.items:
+            line = pending.get(item.product_id)
+            if line and item.is_active:
+                if line.removed:
+                    continue
+                set_committed_value(item, "quantity", item.quantity + line.delta)
+            items.append(item)
+        set_committed_value(cart, "items", items)
+
+    def discard(self, cart_id: int) -> None:
+        """Отбрасывает изменения корзины (например, перед её очисткой)"""
+        self._size -= len(self._pending.pop(cart_id, {}))
+
+    async def flush(self, db: AsyncSession, cart_id: int | None = None) -> None:
+        """
+        Сбрасывает накопленные изменения одной корзины или всех корзин.
+        При ошибке изменения возвращаются в буфер и будут сброшены в следующий раз.
+        """
+        if cart_id is None:
+            batch, self._pending = self._pending, {}
+        else:
+            batch = {cart_id: self._pending.pop(cart_id)} if cart_id in self._pending else {}
+        if not batch:
+            return
+        self._size -= sum(len(lines) for lines in batch.values())
+
+        rows = [
+            (cid, product_id, line.delta, line.removed)
+            for cid, lines in batch.items()
+            for product_id, line in lines.items()
+        ]
+        try:
+            for start in range(0, len(rows), FLUSH_CHUNK):
+                changes = values(
+                    column("cart_id", Integer), column("product_id", Integer),
+                    column("delta", Integer), column("removed", Boolean),
+                    name="changes"
+                ).data(rows[start:start + FLUSH_CHUNK])
+                await db.execute(
+                    update(CartItemModel)
+                    .where(
+                        CartItemModel.cart_id == changes.c.cart_id,
+                        CartItemModel.product_id == changes.c.product_id,
+                        CartItemModel.is_active == True
+                    )
+                    .values(
+                        quantity=CartItemModel.quantity + changes.c.delta,
+                        is_active=not_(changes.c.removed)
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            self._restore(batch)
+            raise
+
+    async def run_flusher(self) -> None:
+        """Фоновая задача: периодический сброс всех накопленных изменений"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                async with async_session_maker() as db:
+                    await self.flush(db)
+            except Exception:
+                logger.exception("Cart store flush failed")
+
+    def _line(self, cart_item: CartItemModel) -> PendingLine:
+        lines = self._pending.setdefault(cart_item.cart_id, {})
+        line = lines.get(cart_item.product_id)
+        if line is None:
+            line = lines[cart_item.product_id] = PendingLine()
+            self._size += 1
+        return line
+
+    def _restore(self, batch: dict[int, dict[int, PendingLine]]) -> None:
+        """Возвращает несброшенную пачку в буфер, объединяя с изменениями, пришедшими за время сброса"""
+        for cart_id, lines in batch.items():
+            current = self._pending.setdefault(cart_id, {})
+            for product_id, line in lines.items():
+                newer = current.get(product_id)
+                if newer is None:
+                    current[product_id] = line
+                    self._size += 1
+                elif not newer.removed:
+                    newer.delta += line.delta
+                    newer.removed = line.removed
+
+    async def _flush_if_full(self, db: AsyncSession) -> None:
+        if self._size >= self.max_pending:
+            await self.flush(db)
+
+
+def build_cart_store(mode: str) -> DirectCartStore:
+    if mode == "memory":
+        return MemoryCartStore(CART_FLUSH_INTERVAL, CART_FLUSH_MAX_PENDING)
+    if mode == "direct":
+        return DirectCartStore()
+    raise ValueError(f"Unknown CART_STORE mode: {mode}")
+
+
+cart_store = build_cart_store(CART_STORE)
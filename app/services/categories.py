@@ -1,9 +1,34 @@
-from sqlalchemy import select, update
+import json
+from typing import NamedTuple
+
+from sqlalchemy import select, update, delete, insert, literal, true, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 
-from app.models.categories import Category as CategoryModel
-from app.shemas import CategoryCreate
+from app.models.categories import Category as CategoryModel, CategoryClosure
+from app.shemas import CategoryCreate, Category as CategorySchema
+from app.cache import catalog_cache
+from app.http_cache import make_etag
+
+
+class CategoryListSnapshot(NamedTuple):
+    """Закэшированный список активных категорий и его ETag (по числу строк и max(updated_at))"""
+    etag: str
+    categories: list[CategorySchema]
+
+
+class CategoryTreeSnapshot(NamedTuple):
+    """Готовое к отдаче дерево категорий: сериализованное тело и его ETag"""
+    etag: str
+    body: bytes
+
+
+def invalidate_category_cache():
+    """
+    Сбрасывает кэш категорий и страниц товаров по категориям после записи.
+    """
+    catalog_cache.invalidate_prefix("categories:")
+    catalog_cache.invalidate_prefix("products:category:")
 
 
 class CategoryService:
@@ -23,18 +48,61 @@ class CategoryService:
         # Создание новой категории
         db_category = CategoryModel(**category.model_dump())
         self.db.add(db_category)
+        await self.db.flush()
+        await self._add_closure_paths(db_category.id, db_category.parent_id)
         await self.db.commit()
         await self.db.refresh(db_category)
+        invalidate_category_cache()
         return db_category
 
-    async def get_all_categories(self):
+    async def get_all_categories(self) -> CategoryListSnapshot:
         """
-        Возвращает список всех активных категорий.
+        Возвращает список всех активных категорий вместе с ETag.
         """
+        return await catalog_cache.get_or_load("categories:all", self._load_all_categories)
+
+    async def _load_all_categories(self) -> CategoryListSnapshot:
+        """Загрузка активных категорий из БД для кэша"""
         result = await self.db.scalars(
             select(CategoryModel).where(CategoryModel.is_active == True)
         )
-        return result.all()
+        categories = result.all()
+        last_update = max((c.updated_at for c in categories), default=None)
+        return CategoryListSnapshot(
+            etag=make_etag("categories", len(categories), last_update.isoformat() if last_update else ""),
+            categories=[CategorySchema.model_validate(c) for c in categories]
+        )
+
+    async def get_category_tree(self) -> CategoryTreeSnapshot:
+        """
+        Возвращает вложенное дерево активных категорий из кэша.
+        Дерево строится за O(n) по одному запросу и сбрасывается при любой записи категорий.
+        """
+        return await catalog_cache.get_or_load("categories:tree", self._build_category_tree)
+
+    async def _build_category_tree(self) -> CategoryTreeSnapshot:
+        """Строит дерево из плоского списка: сначала узлы по id, затем привязка к родителям"""
+        result = await self.db.execute(
+            select(CategoryModel.id, CategoryModel.name, CategoryModel.parent_id)
+            .where(CategoryModel.is_active == True)
+            .order_by(CategoryModel.id)
+        )
+        rows = result.all()
+        nodes = {
+            row.id: {"id": row.id, "name": row.name, "parent_id": row.parent_id, "children": []}
+            for row in rows
+        }
+
+        roots = []
+        for node in nodes.values():
+            if node["parent_id"] is None:
+                roots.append(node)
+            elif node["parent_id"] in nodes:
+                nodes[node["parent_id"]]["children"].append(node)
+            # Подкатегории неактивного родителя в дерево не попадают
+
+        body = json.dumps(roots, ensure_ascii=False, separators=(",", ":")).encode()
+        return CategoryTreeSnapshot(etag=make_etag("categories-tree", body), body=body)
 
     async def delete_category(self, category_id: int):
         """
@@ -53,6 +121,7 @@ class CategoryService:
             .values(is_active=False)
         )
         await self.db.commit()
+        invalidate_category_cache()
         return db_category
 
     async def update_category(self, category_id: int, category: CategoryCreate):
@@ -80,17 +149,87 @@ class CategoryService:
                     status_code=status.HTTP_400_BAD_REQUEST, 
                     detail="Category cannot be its own parent"
                 )
+            if await self._is_descendant(parent.id, category_id):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Category cannot be moved under its own descendant"
+                )
 
         # Обновляем категорию
         update_data = category.model_dump(exclude_unset=True)
+        parent_changed = "parent_id" in update_data and update_data["parent_id"] != db_category.parent_id
         await self.db.execute(
             update(CategoryModel)
             .where(CategoryModel.id == category_id)
             .values(**update_data)
         )
+        if parent_changed:
+            await self._move_closure_subtree(category_id, update_data["parent_id"])
         await self.db.commit()
+        invalidate_category_cache()
         return db_category
 
+    async def _add_closure_paths(self, category_id: int, parent_id: int | None):
+        """
+        Добавляет пути новой категории в таблицу замыкания:
+        (предок родителя, новая категория) для всех предков и (id, id).
+        """
+        paths = select(literal(category_id), literal(category_id), literal(0))
+        if parent_id:
+            paths = union_all(
+                paths,
+                select(CategoryClosure.ancestor_id, literal(category_id), CategoryClosure.depth + 1)
+                .where(CategoryClosure.descendant_id == parent_id)
+            )
+        await self.db.execute(
+            insert(CategoryClosure).from_select(
+                ["ancestor_id", "descendant_id", "depth"], paths
+            )
+        )
+
+    async def _move_closure_subtree(self, category_id: int, new_parent_id: int | None):
+        """
+        Переносит поддерево категории под нового родителя: удаляет пути от старых предков
+        к узлам поддерева и добавляет пути от новых предков (декартово произведение).
+        """
+        subtree = select(CategoryClosure.descendant_id).where(CategoryClosure.ancestor_id == category_id)
+        await self.db.execute(
+            delete(CategoryClosure).where(
+                CategoryClosure.descendant_id.in_(subtree),
+                CategoryClosure.ancestor_id.not_in(subtree)
+            )
+        )
+        if not new_parent_id:
+            return
+
+        ancestors = CategoryClosure.__table__.alias("ancestors")
+        descendants = CategoryClosure.__table__.alias("descendants")
+        await self.db.execute(
+            insert(CategoryClosure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(
+                    ancestors.c.ancestor_id,
+                    descendants.c.descendant_id,
+                    ancestors.c.depth + descendants.c.depth + 1
+                )
+                .select_from(ancestors.join(descendants, true()))
+                .where(
+                    ancestors.c.descendant_id == new_parent_id,
+                    descendants.c.ancestor_id == category_id
+                )
+            )
+        )
+
+    async def _is_descendant(self, category_id: int, ancestor_id: int) -> bool:
+        """Проверяет, лежит ли category_id в поддереве ancestor_id"""
+        result = await self.db.scalar(
+            select(CategoryClosure.depth).where(
+                CategoryClosure.ancestor_id == ancestor_id,
+                CategoryClosure.descendant_id == category_id
+            )
+        )
+        return result is not None
+
     async def _get_category_by_id(self, category_id: int):
         """Вспомогательный метод для получения категории по ID"""
         stmt = select(CategoryModel).where(CategoryModel.id == category_id)
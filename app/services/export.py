@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+from enum import Enum
+from typing import AsyncIterator
+
+from sqlalchemy import select
+
+from app.database.database import async_session_maker
+from app.models.products import Product as ProductModel
+from app.models.reviews import Review as ReviewModel
+from app.models.orders import Order as OrderModel
+
+
+# Сколько строк забирается с серверного курсора за раз и кодируется одним куском ответа
+EXPORT_BATCH_SIZE = 1000
+
+
+def _plain(value):
+    """Приводит значение к виду, пригодному для JSON/CSV"""
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _ndjson_chunk(keys: list[str], rows) -> bytes:
+    lines = (
+        json.dumps({k: _plain(v) for k, v in zip(keys, row)}, ensure_ascii=False, default=str)
+        for row in rows
+    )
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_plain(v) for v in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+class ExportService:
+    """
+    Потоковая выгрузка таблиц в NDJSON или CSV.
+
+    Строки читаются с серверного курсора пачками по EXPORT_BATCH_SIZE, поэтому память
+    не зависит от размера таблицы, а первая пачка уходит клиенту сразу.
+    Генератор открывает собственную сессию: ответ стримится уже после выхода из
+    зависимостей запроса.
+    """
+
+    def __init__(self, session_factory=async_session_maker):
+        self.session_factory = session_factory
+
+    def products(self, fmt: str) -> AsyncIterator[bytes]:
+        stmt = select(
+            ProductModel.id,
+            ProductModel.name,
+            ProductModel.description,
+            ProductModel.price,
+            ProductModel.image_url,
+            ProductModel.stock,
+            ProductModel.category_id,
+            ProductModel.seller_id,
+            ProductModel.rating,
+        ).where(ProductModel.is_active == True).order_by(ProductModel.id)
+        return self._stream(stmt, fmt)
+
+    def reviews(self, fmt: str) -> AsyncIterator[bytes]:
+        stmt = select(
+            ReviewModel.id,
+            ReviewModel.user_id,
+            ReviewModel.product_id,
+            ReviewModel.comment,
+            ReviewModel.comment_date,
+            ReviewModel.grade,
+        ).where(ReviewModel.is_active == True).order_by(ReviewModel.id)
+        return self._stream(stmt, fmt)
+
+    def orders(self, fmt: str) -> AsyncIterator[bytes]:
+        stmt = select(
+            OrderModel.id,
+            OrderModel.user_id,
+            OrderModel.status,
+            OrderModel.created_at,
+            OrderModel.updated_at,
+            OrderModel._total_price.label("total_price"),
+        ).order_by(OrderModel.id)
+        return self._stream(stmt, fmt)
+
+    async def _stream(self, stmt, fmt: str) -> AsyncIterator[bytes]:
+        keys = [c.name for c in stmt.selected_columns]
+        if fmt == "csv":
+            yield _csv_chunk([keys])
+
+        async with self.session_factory() as session:
+            result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for rows in result.partitions():
+                yield _csv_chunk(rows) if fmt == "csv" else _ndjson_chunk(keys, rows)
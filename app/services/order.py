@@ -1,7 +1,7 @@
-from sqlalchemy import select, update
+from sqlalchemy import select, update, insert, delete, literal, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import selectinload, with_loader_criteria
+from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status
 
 from app.models.cart import CartItem, Cart
@@ -9,73 +9,148 @@ from app.models.products import Product
 from app.models.orders import Order, OrderItem
 from app.shemas import User
 from app.shemas import OrderCreate
-from decimal import Decimal
+from app.http_cache import make_etag
+from app.pagination import keyset, page
+from app.services.cart_store import cart_store
+from app.services.products import invalidate_product_cache
+from app.services.reservations import held_quantity
+from app.models.reservations import Reservation
 
 
 class OrderServics:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_list(self, user: User):
-        resalt = await self.db.scalars(select(Order).options(
-            selectinload(Order.orderitems).
-            selectinload(OrderItem.product),
-            with_loader_criteria(Product, Product.is_active == True)
-        ).where(Order.user_id == user.id))
-
-        order = resalt.all()
-        return order
+    async def get_list(self, user: User, limit: int, after: str | None = None):
+        '''
+        Страница истории заказов пользователя без позиций, от новых к старым.
+        Keyset-пагинация по (created_at, id) идёт по индексу ix_orders_user_id_created_at.
+        '''
+        stmt = select(
+            Order.id, Order.user_id, Order.status, Order.created_at, Order.updated_at,
+            Order._total_price.label("total_price")
+        ).where(Order.user_id == user.id)
+        result = await self.db.execute(
+            keyset(stmt, [Order.created_at, Order.id], limit, after, descending=True)
+        )
+        rows, next_cursor = page(result.all(), limit, lambda r: [r.created_at, r.id])
+        return {"items": rows, "next_cursor": next_cursor}
     
     async def get_id(self, user:User, order_id:int):
-        resalt = await self.get_list(user)
-        for i in resalt:
-            if i.id == order_id:
-                return i
-        else:
+        '''
+        Заказ пользователя с позициями: поиск по первичному ключу с проверкой владельца
+        '''
+        order = await self.db.scalar(
+            select(Order)
+            .options(selectinload(Order.orderitems).selectinload(OrderItem.product))
+            .where(Order.id == order_id, Order.user_id == user.id)
+        )
+        if order is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail='Order not found')
+        return order
+
+    async def get_items(self, user: User, order_id: int):
+        '''
+        Позиции заказа пользователя. Товары грузятся без фильтра по is_active:
+        товар, снятый с продажи после покупки, остаётся в истории заказа.
+        '''
+        exists = await self.db.scalar(
+            select(Order.id).where(Order.id == order_id, Order.user_id == user.id)
+        )
+        if exists is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail='Order not found')
+        resalt = await self.db.scalars(
+            select(OrderItem)
+            .options(selectinload(OrderItem.product))
+            .where(OrderItem.order_id == order_id)
+            .order_by(OrderItem.id)
+        )
+        return resalt.all()
         
+    async def get_order_etag(self, user: User, order_id: int) -> str:
+        """
+        ETag заказа по его updated_at; позиции заказа после создания не меняются.
+        """
+        updated_at = await self.db.scalar(
+            select(Order.updated_at).where(Order.id == order_id, Order.user_id == user.id)
+        )
+        if updated_at is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail='Order not found')
+        return make_etag("order", order_id, updated_at.isoformat())
+
     async def checkout_order(self, user: User):
+        # Несброшенные изменения корзины должны попасть в БД до её блокировки
+        if cart_store.buffered:
+            cart_id = await self.db.scalar(select(Cart.id).where(Cart.user_id == user.id))
+            if cart_id is not None:
+                await cart_store.flush(self.db, cart_id)
+
         try:
-            # 1) Берём активную корзину и блокируем её до конца операции
-            cart = await self.db.scalar(
-                select(Cart)
-                .options(selectinload(Cart.items).selectinload(CartItem.product))
+            # 1) Блокируем корзину: параллельные оформления одного пользователя идут по очереди
+            cart_id = await self.db.scalar(
+                select(Cart.id)
                 .where(Cart.user_id == user.id, Cart.is_active == True)
                 .with_for_update()
             )
-            if not cart or not cart.items:
+            if cart_id is None:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Корзина пуста")
+            active_lines = and_(CartItem.cart_id == cart_id, CartItem.is_active == True)
 
-            # 2) Создаём заказ и получаем ID
-            order = Order(user_id=user.id)
-            self.db.add(order)
-            await self.db.flush()
-
-            # 3) Переносим позиции (фиксируем цены)
-            total = Decimal("0.00")
-            for ci in cart.items:
-                if not ci.is_active:
-                    continue
-                unit_price = Decimal(str(ci.product.price))
-                new_order_item = OrderItem(order_id = order.id,
-                          product_id = ci.product.id,
-                          price = unit_price,
-                          quantity = ci.quantity)
-                self.db.add(new_order_item)
-                total += unit_price * ci.quantity
-                ci.is_active = False
+            # 2) Блокируем товары корзины в порядке id, чтобы встречные оформления не взаимоблокировались
+            product_ids = (await self.db.scalars(
+                select(Product.id)
+                .where(Product.id.in_(select(CartItem.product_id).where(active_lines)))
+                .order_by(Product.id)
+                .with_for_update()
+            )).all()
+            if not product_ids:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Корзина пуста")
 
-            # 4) Фиксируем сумму, закрываем корзину, создаём новую
-            order.total_price = total
-            cart.is_active = False
+            # 3) Списываем остатки одним условным UPDATE: строка без нужного остатка не обновится.
+            #    Неистёкшие резервы других корзин в доступный остаток не входят
+            reserved = (await self.db.execute(
+                update(Product)
+                .where(
+                    Product.id == CartItem.product_id,
+                    active_lines,
+                    Product.is_active == True,
+                    Product.stock - held_quantity(Product.id, exclude_cart_id=cart_id) >= CartItem.quantity
+                )
+                .values(stock=Product.stock - CartItem.quantity)
+                .returning(Product.id, Product.price, CartItem.quantity)
+                .execution_options(synchronize_session=False)
+            )).all()
+            short = sorted(set(product_ids) - {row.id for row in reserved})
+            if short:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Недостаточно товара на складе: {short}"
+                )
 
-            # Можно создавать новую корзину «лениво» при первом добавлении,
-            # но если хочется сразу — оставь так:
-            self.db.add(Cart(user_id=user.id, is_active=True))
+            # 4) Создаём заказ и переносим позиции одним INSERT ... SELECT (цены фиксируются)
+            order = Order(user_id=user.id, total_price=sum(row.price * row.quantity for row in reserved))
+            self.db.add(order)
+            await self.db.flush()
+            await self.db.execute(
+                insert(OrderItem).from_select(
+                    ["order_id", "product_id", "price", "quantity"],
+                    select(literal(order.id), Product.id, Product.price, CartItem.quantity)
+                    .join(Product, Product.id == CartItem.product_id)
+                    .where(active_lines)
+                )
+            )
 
-            # 5) Коммит всей операции
+            # 5) Закрываем позиции корзины и снимаем её резервы; сама корзина остаётся для следующих покупок
+            await self.db.execute(
+                update(CartItem).where(active_lines).values(is_active=False)
+                .execution_options(synchronize_session=False)
+            )
+            await self.db.execute(delete(Reservation).where(Reservation.cart_id == cart_id))
             await self.db.commit()
+            invalidate_product_cache(*product_ids)
 
             # 6) Возвращаем заказ с товаром
             return await self.db.scalar(
@@ -86,7 +161,6 @@ class OrderServics:
 
         except IntegrityError:
             await self.db.rollback()
-            # Например, частичный уникальный индекс "одна активная корзина на пользователя"
             raise HTTPException(status_code=409, detail="Конфликт данных при оформлении заказа")
         except Exception:
             await self.db.rollback()
@@ -0,0 +1,144 @@
+import csv
+import io
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+
+from app.models.categories import Category as CategoryModel
+from app.models.users import User as UserModel
+from app.shemas import ProductCreate, ProductImportReport, ProductImportError
+from app.services.products import invalidate_product_cache
+
+
+MAX_IMPORT_ROWS = 200_000
+STAGING_TABLE = "product_import_staging"
+STAGING_COLUMNS = ["row_no", "name", "description", "price", "image_url", "stock", "category_id"]
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in exc.errors()
+    )
+
+
+class ProductImportService:
+    """
+    Массовый импорт товаров продавца из CSV или NDJSON.
+
+    Строки валидируются схемой ProductCreate, категории проверяются одним запросом,
+    корректные строки загружаются через COPY во временную таблицу и переносятся
+    в products одним INSERT ... SELECT. Некорректные строки попадают в отчёт и пропускаются.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def import_products(self, content: bytes, fmt: str, seller: UserModel) -> ProductImportReport:
+        raw_rows = self._parse(content, fmt)
+        if len(raw_rows) > MAX_IMPORT_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Too many rows, maximum is {MAX_IMPORT_ROWS}"
+            )
+
+        errors: list[ProductImportError] = []
+        valid: list[tuple[int, ProductCreate]] = []
+        for row_no, raw in raw_rows:
+            if isinstance(raw, str):
+                errors.append(ProductImportError(row=row_no, error=raw))
+                continue
+            try:
+                valid.append((row_no, ProductCreate.model_validate(raw)))
+            except ValidationError as exc:
+                errors.append(ProductImportError(row=row_no, error=_format_validation_error(exc)))
+
+        # Проверяем все категории одним запросом
+        category_ids = {product.category_id for _, product in valid}
+        active_ids = set()
+        if category_ids:
+            active_ids = set(await self.db.scalars(
+                select(CategoryModel.id).where(
+                    CategoryModel.id.in_(category_ids),
+                    CategoryModel.is_active == True
+                )
+            ))
+
+        records = []
+        for row_no, product in valid:
+            if product.category_id not in active_ids:
+                errors.append(ProductImportError(row=row_no, error="Category not found or inactive"))
+                continue
+            records.append((
+                row_no, product.name, product.description, product.price,
+                product.image_url, product.stock, product.category_id,
+            ))
+
+        imported = await self._copy_and_merge(records, seller.id) if records else 0
+        if imported:
+            invalidate_product_cache()
+
+        errors.sort(key=lambda e: e.row)
+        return ProductImportReport(received=len(raw_rows), imported=imported, errors=errors)
+
+    async def _copy_and_merge(self, records: list[tuple], seller_id: int) -> int:
+        """Загружает строки через COPY во временную таблицу и переносит их в products"""
+        await self.db.execute(text(
+            f"CREATE TEMP TABLE {STAGING_TABLE} ("
+            "row_no integer, name varchar(100), description varchar(500), price double precision, "
+            "image_url varchar(200), stock integer, category_id integer"
+            ") ON COMMIT DROP"
+        ))
+
+        connection = await self.db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            STAGING_TABLE, records=records, columns=STAGING_COLUMNS
+        )
+
+        result = await self.db.execute(
+            text(
+                "INSERT INTO products "
+                "(name, description, price, image_url, stock, category_id, seller_id, is_active) "
+                "SELECT name, description, price, image_url, stock, category_id, :seller_id, true "
+                f"FROM {STAGING_TABLE} ORDER BY row_no"
+            ),
+            {"seller_id": seller_id},
+        )
+        await self.db.commit()
+        return result.rowcount
+
+    def _parse(self, content: bytes, fmt: str) -> list[tuple[int, dict | str]]:
+        """
+        Разбирает файл в список (номер строки, данные). Вместо данных может быть
+        строка с ошибкой разбора.
+        """
+        try:
+            data = content.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File must be UTF-8 encoded"
+            )
+
+        if fmt == "csv":
+            reader = csv.DictReader(io.StringIO(data))
+            return [
+                (row_no, {k: (v if v != "" else None) for k, v in row.items() if k is not None})
+                for row_no, row in enumerate(reader, start=1)
+            ]
+
+        rows = []
+        for row_no, line in enumerate(data.splitlines(), start=1):
+            # Пустые строки пропускаем, но номер строки считаем по файлу
+            if not line.strip():
+                continue
+            try:
+                value = json.loads(line)
+            except json.JSONDecodeError as exc:
+                rows.append((row_no, f"Invalid JSON: {exc.msg}"))
+                continue
+            rows.append((row_no, value if isinstance(value, dict) else "Row must be a JSON object"))
+        return rows
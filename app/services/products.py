@@ -1,12 +1,53 @@
-from sqlalchemy import select, update
+from typing import NamedTuple
+
+from sqlalchemy import select, update, func, values, column, and_, or_, true, any_, Float, Integer
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 
-from app.models.products import Product as ProductModel
-from app.models.categories import Category as CategoryModel
-from app.models.reviews import Review as ReviewModel
+from app.models.products import Product as ProductModel, SEARCH_CONFIG, RATING_SORT_KEY, GRADES
+from app.models.categories import Category as CategoryModel, CategoryClosure
 from app.models.users import User as UserModel
-from app.shemas import ProductCreate, Review as ReviewShemas
+from app.shemas import (
+    ProductCreate, ProductBatchUpdateItem, Product as ProductSchema, ProductDetail, ProductPage, ProductFilter,
+    ProductFacets, FacetBucket, Review as ReviewShemas
+)
+from app.pagination import keyset, page
+from app.cache import catalog_cache
+from app.http_cache import make_etag
+
+# Строк в одном UPDATE ... FROM (VALUES ...): 3 параметра на строку при лимите 32767 у asyncpg
+BATCH_UPDATE_CHUNK = 5000
+
+# Сортировки списков: колонки keyset-ключа, значения ключа для товара, направление
+SORT_KEYS = {
+    "id": ([ProductModel.id], lambda p: [p.id], False),
+    "price": ([ProductModel.price, ProductModel.id], lambda p: [p.price, p.id], False),
+    "-price": ([ProductModel.price, ProductModel.id], lambda p: [p.price, p.id], True),
+    "rating": ([RATING_SORT_KEY, ProductModel.id], lambda p: [p.rating or 0.0, p.id], False),
+    "-rating": ([RATING_SORT_KEY, ProductModel.id], lambda p: [p.rating or 0.0, p.id], True),
+}
+
+# Границы ценовых фасетов [low, high); последняя корзина открыта сверху
+PRICE_BUCKETS = [(0, 500), (500, 1000), (1000, 5000), (5000, 10000), (10000, 50000), (50000, None)]
+# Пороги рейтингового фасета: «не ниже N»
+RATING_THRESHOLDS = [4, 3, 2, 1]
+
+
+class ProductSnapshot(NamedTuple):
+    """Закэшированная карточка товара и её ETag (по id и updated_at)"""
+    etag: str
+    product: ProductDetail
+
+
+def invalidate_product_cache(*product_ids: int):
+    """
+    Сбрасывает кэш каталога после записи: карточки товаров и все страницы списков.
+    """
+    for product_id in product_ids:
+        catalog_cache.invalidate(f"product:{product_id}")
+    catalog_cache.invalidate_prefix("products:")
 
 
 class ProductService:
@@ -30,21 +71,35 @@ class ProductService:
         self.db.add(db_product)
         await self.db.commit()
         await self.db.refresh(db_product)
+        invalidate_product_cache(db_product.id)
         return db_product
 
-    async def get_all_products(self):
+    async def get_all_products(self, filters: ProductFilter, limit: int, after: str | None = None,
+                               with_facets: bool = False):
         """
-        Возвращает список всех активных товаров.
+        Возвращает страницу активных товаров с фильтрами, сортировкой и фасетами.
         """
-        result = await self.db.scalars(
-            select(ProductModel).where(ProductModel.is_active == True)
+        return await catalog_cache.get_or_load(
+            f"products:all:{filters.model_dump_json()}:{limit}:{after}:{with_facets}",
+            lambda: self._get_page([], filters, limit, after, with_facets)
         )
-        return result.all()
 
-    async def get_products_by_category(self, category_id: int):
+    async def get_products_by_category(self, category_id: int, filters: ProductFilter, limit: int,
+                                       after: str | None = None, with_facets: bool = False,
+                                       include_descendants: bool = False):
         """
-        Возвращает список активных товаров в указанной категории.
+        Возвращает страницу активных товаров в указанной категории
+        (или во всём её поддереве при include_descendants).
         """
+        return await catalog_cache.get_or_load(
+            f"products:category:{category_id}:{include_descendants}:{filters.model_dump_json()}:"
+            f"{limit}:{after}:{with_facets}",
+            lambda: self._get_category_page(category_id, filters, limit, after, with_facets, include_descendants)
+        )
+
+    async def _get_category_page(self, category_id: int, filters: ProductFilter, limit: int,
+                                 after: str | None, with_facets: bool, include_descendants: bool):
+        """Загрузка страницы товаров категории из БД"""
         # Проверяем существование категории
         category = await self._get_active_category(category_id)
         if not category:
@@ -53,26 +108,87 @@ class ProductService:
                 detail="Category not found or inactive"
             )
 
-        # Получаем товары категории
-        result = await self.db.scalars(
-            select(ProductModel).where(
-                ProductModel.category_id == category_id,
-                ProductModel.is_active == True
+        # Получаем товары категории или всего поддерева по таблице замыкания.
+        # Неактивная категория скрывает всё своё поддерево: исключаем потомков
+        # каждой неактивной категории внутри поддерева (включая её саму, путь глубины 0)
+        if include_descendants:
+            inactive = aliased(CategoryClosure)
+            hidden = (
+                select(CategoryClosure.descendant_id)
+                .join(inactive, inactive.descendant_id == CategoryClosure.ancestor_id)
+                .join(CategoryModel, CategoryModel.id == inactive.descendant_id)
+                .where(inactive.ancestor_id == category_id, CategoryModel.is_active == False)
             )
+            subtree = select(CategoryClosure.descendant_id).where(
+                CategoryClosure.ancestor_id == category_id,
+                CategoryClosure.descendant_id.not_in(hidden)
+            )
+            conditions = [ProductModel.category_id.in_(subtree)]
+        else:
+            conditions = [ProductModel.category_id == category_id]
+        return await self._get_page(conditions, filters, limit, after, with_facets)
+
+    async def search_products(self, query: str, limit: int, after: str | None = None):
+        """
+        Полнотекстовый поиск по названию и описанию активных товаров.
+        Совпадения ищутся по GIN-индексу, результаты упорядочены по релевантности.
+        """
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        rank = func.ts_rank_cd(ProductModel.search_vector, ts_query, type_=Float).label("rank")
+
+        stmt = select(ProductModel, rank).where(
+            ProductModel.is_active == True,
+            ProductModel.search_vector.op("@@")(ts_query)
+        )
+        result = await self.db.execute(
+            keyset(stmt, [rank, ProductModel.id], limit, after, descending=True)
         )
-        return result.all()
+        rows, next_cursor = page(result.all(), limit, lambda r: [r.rank, r.Product.id])
+        return {"items": [r.Product for r in rows], "next_cursor": next_cursor}
 
-    async def get_product(self, product_id: int):
+    async def get_product(self, product_id: int) -> ProductSnapshot:
         """
-        Возвращает детальную информацию о товаре.
+        Возвращает детальную информацию о товаре вместе с ETag.
         """
+        return await catalog_cache.get_or_load(
+            f"product:{product_id}",
+            lambda: self._load_product(product_id)
+        )
+
+    async def get_rating_histograms(self, product_ids: list[int]) -> list[dict]:
+        """
+        Распределения оценок для набора активных товаров (для страниц списков).
+        Читаются только счётчики из products, таблица reviews не затрагивается.
+        """
+        rows = await self.db.execute(
+            select(
+                ProductModel.id, ProductModel.rating_count,
+                *(getattr(ProductModel, f"rating_{grade}") for grade in GRADES)
+            )
+            .where(ProductModel.id == any_(product_ids), ProductModel.is_active == True)
+            .order_by(ProductModel.id)
+        )
+        return [
+            {
+                "product_id": row.id,
+                "total": row.rating_count,
+                "counts": {grade: getattr(row, f"rating_{grade}") for grade in GRADES},
+            }
+            for row in rows
+        ]
+
+    async def _load_product(self, product_id: int) -> ProductSnapshot:
+        """Загрузка активного товара из БД для кэша"""
         product = await self._get_active_product(product_id)
         if not product:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
                 detail="Product not found or inactive"
             )
-        return product
+        return ProductSnapshot(
+            etag=make_etag("product", product.id, product.updated_at.isoformat()),
+            product=ProductDetail.model_validate(product)
+        )
 
     async def update_product(self, product_id: int, product_data: ProductCreate, seller: UserModel):
         """
@@ -108,8 +224,51 @@ class ProductService:
         )
         await self.db.commit()
         await self.db.refresh(product)
+        invalidate_product_cache(product_id)
         return product
 
+    async def batch_update_products(self, items: list[ProductBatchUpdateItem], seller: UserModel):
+        """
+        Частично обновляет цену и/или остаток у набора товаров продавца.
+        Каждая пачка применяется одним UPDATE ... FROM (VALUES ...); возвращаются только изменившиеся товары.
+        """
+        # При повторе id побеждает последняя запись
+        latest = list({item.id: item for item in items}.values())
+
+        changed = []
+        for start in range(0, len(latest), BATCH_UPDATE_CHUNK):
+            chunk = latest[start:start + BATCH_UPDATE_CHUNK]
+            changes = values(
+                column("id", Integer), column("price", Float), column("stock", Integer),
+                name="changes"
+            ).data([(item.id, item.price, item.stock) for item in chunk])
+
+            stmt = (
+                update(ProductModel)
+                .where(
+                    ProductModel.id == changes.c.id,
+                    ProductModel.seller_id == seller.id,
+                    ProductModel.is_active == True,
+                    or_(
+                        and_(changes.c.price.is_not(None), changes.c.price.is_distinct_from(ProductModel.price)),
+                        and_(changes.c.stock.is_not(None), changes.c.stock.is_distinct_from(ProductModel.stock)),
+                    )
+                )
+                .values(
+                    price=func.coalesce(changes.c.price, ProductModel.price),
+                    stock=func.coalesce(changes.c.stock, ProductModel.stock),
+                )
+                .returning(ProductModel)
+                .execution_options(synchronize_session=False)
+            )
+            result = await self.db.scalars(stmt)
+            changed.extend(result.all())
+
+        await self.db.commit()
+        if changed:
+            invalidate_product_cache(*(p.id for p in changed))
+        return changed
+
     async def delete_product(self, product_id: int, seller: UserModel):
         """
         Выполняет мягкое удаление товара, если он принадлежит продавцу.
@@ -136,25 +295,100 @@ class ProductService:
         )
         await self.db.commit()
         await self.db.refresh(product)
+        invalidate_product_cache(product_id)
         return product
 
-    async def get_product_reviews(self, product_id: int):
+    async def get_product_reviews_etag(self, product_id: int, *variant) -> str:
         """
-        Возвращает отзывы для продукта.
+        ETag отзывов товара. Любое создание или удаление отзыва пересчитывает рейтинг
+        и тем самым меняет updated_at товара, поэтому версия берётся из карточки товара.
         """
-        # Проверяем существование продукта
-        product = await self._get_active_product(product_id)
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
+        snapshot = await self.get_product(product_id)
+        return make_etag("reviews", snapshot.etag, *variant)
 
-        # Получаем отзывы
-        result = await self.db.scalars(
-            select(ReviewModel).where(
-                ReviewModel.is_active == True,
-                ReviewModel.product_id == product_id
-            )
+    async def _get_page(self, conditions: list, filters: ProductFilter, limit: int,
+                        after: str | None, with_facets: bool):
+        """
+        Выполняет запрос с фильтрами и keyset-пагинацией и формирует страницу.
+        Фасеты считаются некоррелированным подзапросом в том же SQL-запросе.
+        """
+        base = [ProductModel.is_active == True, *conditions]
+        if filters.in_stock:
+            base.append(ProductModel.stock > 0)
+        if filters.seller_id is not None:
+            base.append(ProductModel.seller_id == filters.seller_id)
+        price_filter = self._price_conditions(filters)
+        rating_filter = self._rating_conditions(filters)
+
+        columns, key, descending = SORT_KEYS[filters.sort]
+        stmt = select(ProductModel).where(*base, *price_filter, *rating_filter)
+        facets = None
+        if with_facets:
+            facets = self._facets_query(base, price_filter, rating_filter)
+            stmt = stmt.add_columns(facets.scalar_subquery().label("facets"))
+
+        result = await self.db.execute(keyset(stmt, columns, limit, after, descending))
+        rows, next_cursor = page(result.all(), limit, lambda r: key(r.Product))
+
+        facet_counts = None
+        if with_facets:
+            counts = rows[0].facets if rows else await self.db.scalar(facets)
+            facet_counts = self._build_facets(counts)
+
+        return ProductPage.model_validate(
+            {"items": [r.Product for r in rows], "next_cursor": next_cursor, "facets": facet_counts},
+            from_attributes=True
+        )
+
+    @staticmethod
+    def _price_conditions(filters: ProductFilter) -> list:
+        conditions = []
+        if filters.min_price is not None:
+            conditions.append(ProductModel.price >= filters.min_price)
+        if filters.max_price is not None:
+            conditions.append(ProductModel.price <= filters.max_price)
+        return conditions
+
+    @staticmethod
+    def _rating_conditions(filters: ProductFilter) -> list:
+        if filters.min_rating is None:
+            return []
+        return [RATING_SORT_KEY >= filters.min_rating]
+
+    @staticmethod
+    def _facets_query(base: list, price_filter: list, rating_filter: list):
+        """
+        Один агрегирующий запрос со всеми счётчиками фасетов.
+        Ценовые корзины считаются без учёта фильтра по цене, рейтинговые — без фильтра по рейтингу,
+        чтобы клиент видел, сколько товаров даст смена значения фасета.
+        """
+        price_cond = and_(true(), *price_filter)
+        rating_cond = and_(true(), *rating_filter)
+        counts = [func.count().filter(and_(price_cond, rating_cond))]
+        for low, high in PRICE_BUCKETS:
+            bucket = ProductModel.price >= low
+            if high is not None:
+                bucket = and_(bucket, ProductModel.price < high)
+            counts.append(func.count().filter(and_(bucket, rating_cond)))
+        for low in RATING_THRESHOLDS:
+            counts.append(func.count().filter(and_(RATING_SORT_KEY >= low, price_cond)))
+        return select(array(counts)).where(*base)
+
+    @staticmethod
+    def _build_facets(counts: list[int]) -> ProductFacets:
+        total, rest = counts[0], counts[1:]
+        price_counts, rating_counts = rest[:len(PRICE_BUCKETS)], rest[len(PRICE_BUCKETS):]
+        return ProductFacets(
+            total=total,
+            price=[
+                FacetBucket(min=low, max=high, count=count)
+                for (low, high), count in zip(PRICE_BUCKETS, price_counts)
+            ],
+            rating=[
+                FacetBucket(min=low, count=count)
+                for low, count in zip(RATING_THRESHOLDS, rating_counts)
+            ],
         )
-        return result.all()
 
     async def _get_active_category(self, category_id: int):
         """Получение активной категории"""
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy import select, delete, insert, func, literal, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+
+from app.config import RESERVATION_TTL_SECONDS, RESERVATION_SWEEP_INTERVAL, RESERVATION_SWEEP_BATCH
+from app.database.database import async_session_maker
+from app.models.cart import Cart as CartModel, CartItem as CartItemModel
+from app.models.products import Product
+from app.models.reservations import Reservation
+from app.models.users import User as UserModel
+from app.services.cart_store import cart_store
+
+
+logger = logging.getLogger(__name__)
+
+
+def held_quantity(product_id, exclude_cart_id=None):
+    """
+    Коррелированный подзапрос: сумма неистёкших резервов товара (без резервов указанной корзины).
+    Читается из покрывающего индекса ix_reservations_product_expires.
+    """
+    conditions = [Reservation.product_id == product_id, Reservation.expires_at > func.now()]
+    if exclude_cart_id is not None:
+        conditions.append(Reservation.cart_id != exclude_cart_id)
+    return func.coalesce(
+        select(func.sum(Reservation.quantity)).where(*conditions).scalar_subquery(), 0
+    )
+
+
+class ReservationService:
+    """
+    Резервирование товаров корзины между переходом к оформлению и оплатой.
+
+    Резерв — строка в reservations со сроком жизни; строки products не блокируются
+    на всё время резерва, а только на время одного короткого оператора резервирования.
+    Истёкшие резервы не учитываются сразу и удаляются фоновым уборщиком пачками.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def reserve_cart(self, user: UserModel):
+        """
+        Резервирует все активные позиции корзины одним INSERT ... SELECT.
+        Если хотя бы одной позиции не хватает остатка, не резервируется ничего.
+        """
+        cart_id = await self._get_cart_id(user)
+        await cart_store.flush(self.db, cart_id)
+        active_lines = and_(CartItemModel.cart_id == cart_id, CartItemModel.is_active == True)
+
+        try:
+            # Короткая блокировка товаров корзины в порядке id: параллельные резервирования
+            # и оформления заказов по тем же товарам выполняются по очереди
+            product_ids = (await self.db.scalars(
+                select(Product.id)
+                .where(Product.id.in_(select(CartItemModel.product_id).where(active_lines)))
+                .order_by(Product.id)
+                .with_for_update()
+            )).all()
+            if not product_ids:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Корзина пуста")
+
+            # Повторное резервирование заменяет прежние резервы корзины
+            await self.db.execute(delete(Reservation).where(Reservation.cart_id == cart_id))
+
+            expires_at = func.now() + timedelta(seconds=RESERVATION_TTL_SECONDS)
+            reserved = (await self.db.execute(
+                insert(Reservation).from_select(
+                    ["cart_id", "product_id", "quantity", "expires_at"],
+                    select(literal(cart_id), Product.id, CartItemModel.quantity, expires_at)
+                    .join(Product, Product.id == CartItemModel.product_id)
+                    .where(
+                        active_lines,
+                        Product.is_active == True,
+                        Product.stock - held_quantity(Product.id) >= CartItemModel.quantity
+                    )
+                ).returning(Reservation.product_id, Reservation.quantity, Reservation.expires_at)
+            )).all()
+
+            short = sorted(set(product_ids) - {row.product_id for row in reserved})
+            if short:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Недостаточно товара на складе: {short}"
+                )
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+
+        return {
+            "cart_id": cart_id,
+            "expires_at": reserved[0].expires_at,
+            "items": [{"product_id": row.product_id, "quantity": row.quantity} for row in reserved],
+        }
+
+    async def release_cart(self, user: UserModel):
+        """
+        Снимает все резервы корзины
+        """
+        cart_id = await self._get_cart_id(user)
+        await self.db.execute(delete(Reservation).where(Reservation.cart_id == cart_id))
+        await self.db.commit()
+        return {"cart_id": cart_id, "message": "Резерв снят"}
+
+    async def get_cart_availability(self, user: UserModel):
+        """
+        Доступность всех позиций корзины одним запросом: остаток за вычетом
+        неистёкших резервов других корзин и собственный резерв корзины.
+        """
+        cart_id = await self._get_cart_id(user)
+        await cart_store.flush(self.db, cart_id)
+
+        holds = (
+            select(
+                Reservation.product_id,
+                func.sum(Reservation.quantity).filter(Reservation.cart_id != cart_id).label("others"),
+                func.sum(Reservation.quantity).filter(Reservation.cart_id == cart_id).label("own"),
+            )
+            .where(
+                Reservation.product_id.in_(
+                    select(CartItemModel.product_id).where(
+                        CartItemModel.cart_id == cart_id, CartItemModel.is_active == True
+                    )
+                ),
+                Reservation.expires_at > func.now()
+            )
+            .group_by(Reservation.product_id)
+            .subquery()
+        )
+        rows = (await self.db.execute(
+            select(
+                CartItemModel.product_id,
+                CartItemModel.quantity.label("requested"),
+                (Product.stock - func.coalesce(holds.c.others, 0)).label("available"),
+                func.coalesce(holds.c.own, 0).label("held"),
+            )
+            .join(Product, Product.id == CartItemModel.product_id)
+            .outerjoin(holds, holds.c.product_id == CartItemModel.product_id)
+            .where(
+                CartItemModel.cart_id == cart_id,
+                CartItemModel.is_active == True,
+                Product.is_active == True
+            )
+            .order_by(CartItemModel.product_id)
+        )).all()
+
+        items = [
+            {
+                "product_id": row.product_id,
+                "requested": row.requested,
+                "available": max(row.available, 0),
+                "held": row.held,
+            }
+            for row in rows
+        ]
+        return {
+            "items": items,
+            "all_available": all(item["available"] >= item["requested"] for item in items),
+        }
+
+    async def _get_cart_id(self, user: UserModel) -> int:
+        cart_id = await self.db.scalar(select(CartModel.id).where(CartModel.user_id == user.id))
+        if cart_id is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Корзина пуста")
+        return cart_id
+
+
+async def expire_reservations(db: AsyncSession, batch_size: int = RESERVATION_SWEEP_BATCH) -> int:
+    """
+    Удаляет истёкшие резервы пачками по batch_size строк, коммитя каждую пачку.
+    Возвращает число удалённых строк.
+    """
+    total = 0
+    while True:
+        expired = (
+            select(Reservation.id)
+            .where(Reservation.expires_at <= func.now())
+            .order_by(Reservation.expires_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        deleted = (await db.execute(
+            delete(Reservation).where(Reservation.id.in_(expired))
+        )).rowcount
+        await db.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+async def run_sweeper() -> None:
+    """Фоновая задача: периодическая уборка истёкших резервов"""
+    while True:
+        await asyncio.sleep(RESERVATION_SWEEP_INTERVAL)
+        try:
+            async with async_session_maker() as db:
+                await expire_reservations(db)
+        except Exception:
+            logger.exception("Reservation sweep failed")
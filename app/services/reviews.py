@@ -1,25 +1,61 @@
-from sqlalchemy import select, update, func
+from sqlalchemy import select, update, func, cast, any_, Numeric
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 
 from app.models.reviews import Review as ReviewModel
-from app.models.products import Product as ProductModel
+from app.models.products import Product as ProductModel, GRADES
 from app.models.users import User as UserModel
-from app.shemas import CreateReview
+from app.shemas import CreateReview, ReviewModeration
+from app.services.products import ProductService, invalidate_product_cache
+from app.pagination import keyset, page
+
+
+def derived_rating(rating_sum, rating_count):
+    """Рейтинг из суммы и количества оценок: NULL, если оценок нет"""
+    return func.round(cast(rating_sum, Numeric) / func.nullif(rating_count, 0), 2)
+
+
+def rating_delta_values(sum_delta, count_delta, grade_deltas: dict) -> dict:
+    """
+    Значения SET для инкрементального изменения счётчиков рейтинга и гистограммы товара.
+    grade_deltas — изменение количества отзывов по оценкам {оценка: delta}.
+    В SET колонки читаются со старыми значениями, поэтому новый рейтинг считается из old + delta.
+    """
+    new_sum = ProductModel.rating_sum + sum_delta
+    new_count = ProductModel.rating_count + count_delta
+    values = {
+        "rating_sum": new_sum,
+        "rating_count": new_count,
+        "rating": derived_rating(new_sum, new_count),
+    }
+    for grade, delta in grade_deltas.items():
+        column = f"rating_{grade}"
+        values[column] = getattr(ProductModel, column) + delta
+    return values
 
 
 class ReviewService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_all_reviews(self):
+    async def get_all_reviews(self, limit: int, after: str | None = None):
         """
-        Возвращает список всех активных отзывов.
+        Возвращает страницу всех активных отзывов, от новых к старым.
         """
+        return await self._get_page([], limit, after)
+
+    async def _get_page(self, conditions: list, limit: int, after: str | None):
+        """
+        Страница активных отзывов с keyset-пагинацией по (comment_date, id) по убыванию.
+        Каждому набору условий соответствует составной индекс (..., is_active, comment_date, id),
+        поэтому любая страница читается из индекса за то же время, что и первая.
+        """
+        stmt = select(ReviewModel).where(ReviewModel.is_active == True, *conditions)
         result = await self.db.scalars(
-            select(ReviewModel).where(ReviewModel.is_active == True)
+            keyset(stmt, [ReviewModel.comment_date, ReviewModel.id], limit, after, descending=True)
         )
-        return result.all()
+        rows, next_cursor = page(result.all(), limit, lambda r: [r.comment_date, r.id])
+        return {"items": rows, "next_cursor": next_cursor}
 
     async def create_review(self, review_data: CreateReview, user: UserModel):
         """
@@ -47,14 +83,18 @@ class ReviewService:
                 detail='You have already reviewed this product'
             )
 
-        # Создаем отзыв
+        # Создаем отзыв и в той же транзакции прибавляем оценку к счётчикам товара
         db_review = ReviewModel(**review_data.model_dump(), user_id=user.id)
         self.db.add(db_review)
+        await self.db.flush()
+        await self.db.execute(
+            update(ProductModel)
+            .where(ProductModel.id == review_data.product_id)
+            .values(**rating_delta_values(review_data.grade, 1, {review_data.grade: 1}))
+        )
         await self.db.commit()
         await self.db.refresh(db_review)
-
-        # Обновляем рейтинг продукта
-        await self._update_product_rating(review_data.product_id)
+        invalidate_product_cache(review_data.product_id)
 
         return db_review
 
@@ -62,53 +102,113 @@ class ReviewService:
         """
         Логическое удаление отзыва.
         """
-        review = await self._get_review_by_id(review_id)
-        if not review:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail='Review not found'
-            )
-
-        # Сохраняем product_id перед удалением
-        product_id = review.product_id
-
-        # Логическое удаление
-        await self.db.execute(
+        # Логическое удаление; оценка вычитается, только если отзыв был активен
+        deleted = (await self.db.execute(
             update(ReviewModel)
-            .where(ReviewModel.id == review_id)
+            .where(ReviewModel.id == review_id, ReviewModel.is_active == True)
             .values(is_active=False)
+            .returning(ReviewModel.product_id, ReviewModel.grade)
+        )).first()
+        if deleted is None:
+            review = await self._get_review_by_id(review_id)
+            if not review:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail='Review not found'
+                )
+            return {"message": "Review deleted successfully"}
+
+        await self.db.execute(
+            update(ProductModel)
+            .where(ProductModel.id == deleted.product_id)
+            .values(**rating_delta_values(-deleted.grade, -1, {deleted.grade: -1}))
         )
         await self.db.commit()
-
-        # Обновляем рейтинг продукта
-        await self._update_product_rating(product_id)
+        invalidate_product_cache(deleted.product_id)
 
         return {"message": "Review deleted successfully"}
 
-    async def _update_product_rating(self, product_id: int):
+    async def moderate_reviews(self, moderation: ReviewModeration):
         """
-        Обновляет средний рейтинг продукта.
+        Массовое снятие отзывов одним оператором:
+        UPDATE reviews ... RETURNING product_id, grade в CTE, агрегирование по товарам
+        и UPDATE products ... FROM с вычитанием сумм, количеств и гистограммы.
         """
-        # Получаем средний рейтинг
-        avg_rating = await self.db.scalar(
-            select(func.avg(ReviewModel.grade))
-            .where(
-                ReviewModel.is_active == True,
-                ReviewModel.product_id == product_id
+        conditions = [ReviewModel.is_active == True]
+        if moderation.review_ids is not None:
+            conditions.append(ReviewModel.id == any_(moderation.review_ids))
+        if moderation.user_id is not None:
+            conditions.append(ReviewModel.user_id == moderation.user_id)
+
+        moderated = (
+            update(ReviewModel)
+            .where(*conditions)
+            .values(is_active=False)
+            .returning(ReviewModel.product_id, ReviewModel.grade)
+            .cte("moderated")
+        )
+        deltas = (
+            select(
+                moderated.c.product_id,
+                func.sum(moderated.c.grade).label("rating_sum"),
+                func.count().label("rating_count"),
+                *(func.count().filter(moderated.c.grade == grade).label(f"rating_{grade}") for grade in GRADES),
             )
+            .group_by(moderated.c.product_id)
+            .cte("deltas")
         )
-        
-        # Округляем до 2 знаков после запятой
-        rounded_rating = round(avg_rating, 2) if avg_rating is not None else None
-
-        # Обновляем рейтинг продукта
-        await self.db.execute(
+        rows = (await self.db.execute(
             update(ProductModel)
-            .where(ProductModel.id == product_id)
-            .values(rating=rounded_rating)
-        )
+            .where(ProductModel.id == deltas.c.product_id)
+            .values(**rating_delta_values(
+                -deltas.c.rating_sum, -deltas.c.rating_count,
+                {grade: -deltas.c[f"rating_{grade}"] for grade in GRADES}
+            ))
+            .returning(ProductModel.id, deltas.c.rating_count)
+            .execution_options(synchronize_session=False)
+        )).all()
         await self.db.commit()
 
+        product_ids = sorted(row.id for row in rows)
+        if product_ids:
+            invalidate_product_cache(*product_ids)
+        return {
+            "moderated": sum(row.rating_count for row in rows),
+            "products": product_ids,
+        }
+
+    async def check_rating_consistency(self, limit: int = 100):
+        """
+        Сверяет счётчики рейтинга товаров с фактическими активными отзывами.
+        Возвращает товары, у которых rating_sum/rating_count разошлись с отзывами.
+        """
+        actual = (
+            select(
+                ReviewModel.product_id,
+                func.sum(ReviewModel.grade).label("actual_sum"),
+                func.count().label("actual_count"),
+            )
+            .where(ReviewModel.is_active == True)
+            .group_by(ReviewModel.product_id)
+            .subquery()
+        )
+        actual_sum = func.coalesce(actual.c.actual_sum, 0)
+        actual_count = func.coalesce(actual.c.actual_count, 0)
+        result = await self.db.execute(
+            select(
+                ProductModel.id.label("product_id"),
+                ProductModel.rating_sum,
+                ProductModel.rating_count,
+                actual_sum.label("actual_sum"),
+                actual_count.label("actual_count"),
+            )
+            .outerjoin(actual, actual.c.product_id == ProductModel.id)
+            .where((ProductModel.rating_sum != actual_sum) | (ProductModel.rating_count != actual_count))
+            .order_by(ProductModel.id)
+            .limit(limit)
+        )
+        return result.all()
+
     async def _get_active_product(self, product_id: int):
         """Получение активного продукта"""
         result = await self.db.scalar(
@@ -126,9 +226,16 @@ class ReviewService:
         )
         return result
 
-    async def get_product_reviews(self, product_id: int):
+    async def get_product_reviews_etag(self, product_id: int, *variant) -> str:
         """
-        Получение всех активных отзывов для продукта.
+        ETag отзывов товара (см. ProductService.get_product_reviews_etag).
+        """
+        return await ProductService(self.db).get_product_reviews_etag(product_id, *variant)
+
+    async def get_product_reviews(self, product_id: int, limit: int, after: str | None = None):
+        """
+        Страница активных отзывов продукта, от новых к старым.
+        Общий путь для /reviews/product/{id} и /products/{id}/reviews/.
         """
         # Проверяем существование продукта
         product = await self._get_active_product(product_id)
@@ -138,25 +245,10 @@ class ReviewService:
                 detail='Product not found'
             )
 
-        # Получаем отзывы
-        result = await self.db.scalars(
-            select(ReviewModel)
-            .where(
-                ReviewModel.product_id == product_id,
-                ReviewModel.is_active == True
-            )
-        )
-        return result.all()
+        return await self._get_page([ReviewModel.product_id == product_id], limit, after)
 
-    async def get_user_reviews(self, user_id: int):
+    async def get_user_reviews(self, user_id: int, limit: int, after: str | None = None):
         """
-        Получение всех отзывов пользователя.
+        Страница активных отзывов пользователя, от новых к старым.
         """
-        result = await self.db.scalars(
-            select(ReviewModel)
-            .where(
-                ReviewModel.user_id == user_id,
-                ReviewModel.is_active == True
-            )
-        )
-        return result.all()
\ No newline at end of file
+        return await self._get_page([ReviewModel.user_id == user_id], limit, after)
\ No newline at end of file
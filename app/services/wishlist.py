@@ -1,5 +1,5 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, func
 from sqlalchemy.orm import selectinload, with_loader_criteria
 from fastapi import HTTPException, status
 
@@ -39,10 +39,16 @@ class WishlistService:
 
     async def get_wishlist_items_count(self, user: UserModel) -> int:
         """
-        Получение количества товаров в вишлисте
+        Получение количества товаров в вишлисте (COUNT по индексу активных позиций)
         """
-        wishlist = await self.get_or_create_wishlist(user)
-        return len(wishlist.items)
+        return await self.db.scalar(
+            select(func.count(WishlistItemModel.id))
+            .join(WishlistModel, WishlistModel.id == WishlistItemModel.wishlist_id)
+            .where(
+                WishlistModel.user_id == user.id,
+                WishlistItemModel.is_active == True
+            )
+        )
 
     async def add_product_to_wishlist(self, user: UserModel, product_id: int) -> WishlistItemModel:
         wishlist = await self.get_or_create_wishlist(user)
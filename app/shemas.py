@@ -1,5 +1,5 @@
-from typing import Optional
-from pydantic import BaseModel, ConfigDict, Field, EmailStr, computed_field, AliasChoices
+from typing import Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, computed_field, model_validator, AliasChoices
 from datetime import datetime
 
 class CategoryCreate(BaseModel):
@@ -25,6 +25,16 @@ class Category(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CategoryTreeNode(BaseModel):
+    """
+    Узел дерева категорий с вложенными подкатегориями.
+    """
+    id: int = Field(..., description="Уникальный идентификатор категории")
+    name: str = Field(..., description="Название категории")
+    parent_id: Optional[int] = Field(None, description="ID родительской категории, если есть")
+    children: list["CategoryTreeNode"] = Field(default_factory=list, description="Подкатегории")
+
+
 class ProductCreate(BaseModel):
     """
     Модель для создания и обновления товара.
@@ -58,6 +68,98 @@ class Product(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class RatingHistogram(BaseModel):
+    """
+    Распределение оценок товара по активным отзывам.
+    """
+    product_id: int = Field(..., description="ID товара")
+    total: int = Field(..., description="Количество оценок")
+    counts: dict[int, int] = Field(..., description="Количество отзывов по оценке 1..5")
+
+    @computed_field(return_type=dict[int, float])
+    def percentages(self):
+        return {
+            grade: round(100 * count / self.total, 1) if self.total else 0.0
+            for grade, count in self.counts.items()
+        }
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ProductDetail(Product):
+    """
+    Карточка товара с распределением оценок.
+    """
+    rating_histogram: RatingHistogram = Field(..., description="Распределение оценок")
+
+
+class ProductBatchUpdateItem(BaseModel):
+    """
+    Частичное обновление цены и/или остатка одного товара в пакетном запросе.
+    """
+    id: int = Field(..., description="ID товара")
+    price: Optional[float] = Field(None, gt=0, description="Новая цена (больше 0)")
+    stock: Optional[int] = Field(None, ge=0, description="Новый остаток (0 или больше)")
+
+
+class ProductFilter(BaseModel):
+    """
+    Фильтры и сортировка списков товаров (query-параметры).
+    """
+    min_price: Optional[float] = Field(None, ge=0, description="Минимальная цена")
+    max_price: Optional[float] = Field(None, ge=0, description="Максимальная цена")
+    min_rating: Optional[float] = Field(None, ge=0, le=5, description="Минимальный рейтинг")
+    in_stock: bool = Field(False, description="Только товары в наличии")
+    seller_id: Optional[int] = Field(None, description="ID продавца")
+    sort: Literal["id", "price", "-price", "rating", "-rating"] = Field(
+        "id", description="Сортировка: id, price, rating; минус — по убыванию"
+    )
+
+
+class FacetBucket(BaseModel):
+    """
+    Корзина фасета: диапазон [min, max) и количество товаров в нём.
+    """
+    min: Optional[float] = Field(None, description="Нижняя граница (включительно)")
+    max: Optional[float] = Field(None, description="Верхняя граница (не включительно)")
+    count: int = Field(..., description="Количество товаров")
+
+
+class ProductFacets(BaseModel):
+    """
+    Счётчики фасетов для текущих фильтров.
+    """
+    total: int = Field(..., description="Всего товаров под фильтрами")
+    price: list[FacetBucket] = Field(..., description="Распределение по ценовым диапазонам")
+    rating: list[FacetBucket] = Field(..., description="Количество товаров с рейтингом не ниже min")
+
+
+class ProductPage(BaseModel):
+    """
+    Страница списка товаров с курсором на следующую страницу.
+    """
+    items: list[Product] = Field(..., description="Товары текущей страницы")
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы (after), если она есть")
+    facets: Optional[ProductFacets] = Field(None, description="Фасеты, если запрошены (facets=true)")
+
+
+
+class ProductImportError(BaseModel):
+    """
+    Ошибка одной строки массового импорта товаров.
+    """
+    row: int = Field(..., description="Номер строки в файле (начиная с 1, без заголовка)")
+    error: str = Field(..., description="Описание ошибки")
+
+
+class ProductImportReport(BaseModel):
+    """
+    Итог массового импорта товаров.
+    """
+    received: int = Field(..., description="Количество строк в файле")
+    imported: int = Field(..., description="Количество созданных товаров")
+    errors: list[ProductImportError] = Field(default_factory=list, description="Отклонённые строки")
+
 
 class UserCreate(BaseModel):
     email: EmailStr = Field(description="Email пользователя")
@@ -91,10 +193,64 @@ class Review(BaseModel):
 
 
 
+class ReviewModeration(BaseModel):
+    """
+    Массовая модерация отзывов: по списку id и/или по автору.
+    Условия объединяются через AND, нужно хотя бы одно.
+    """
+    review_ids: Optional[list[int]] = Field(None, min_length=1, max_length=10000, description="ID отзывов")
+    user_id: Optional[int] = Field(None, description="Все отзывы пользователя")
+
+    @model_validator(mode="after")
+    def check_filter(self):
+        if self.review_ids is None and self.user_id is None:
+            raise ValueError("Укажите review_ids и/или user_id")
+        return self
+
+
+class ReviewModerationResult(BaseModel):
+    moderated: int = Field(..., description="Сколько отзывов снято")
+    products: list[int] = Field(..., description="Товары, у которых пересчитан рейтинг")
+
+
+class ReviewPage(BaseModel):
+    """
+    Страница отзывов, от новых к старым.
+    """
+    items: list[Review] = Field(..., description="Отзывы текущей страницы")
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы (after), если она есть")
+
+
+class RatingMismatch(BaseModel):
+    """
+    Товар, у которого счётчики рейтинга разошлись с активными отзывами.
+    """
+    product_id: int
+    rating_sum: int = Field(..., description="Сумма оценок в products")
+    rating_count: int = Field(..., description="Количество оценок в products")
+    actual_sum: int = Field(..., description="Сумма оценок активных отзывов")
+    actual_count: int = Field(..., description="Количество активных отзывов")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class CartItemCreate(BaseModel):
     product_id: int
     quantity: int
 
+class CartItemUpserted(BaseModel):
+    """
+    Позиция корзины после добавления товара (без повторной загрузки всей корзины).
+    """
+    id: int
+    cart_id: int
+    product_id: int
+    quantity: int = Field(..., description="Количество товара в позиции после добавления")
+    is_active: bool
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class CategoryShort(BaseModel):
     name: str
     model_config = ConfigDict(from_attributes=True)
@@ -127,11 +283,11 @@ class Cart(BaseModel):
     items : list[CartItems]
     @computed_field(return_type=int)
     def total(self):
-        return sum([i.quantity for i in self.items if i.is_active == True])
+        return sum(i.quantity for i in self.items if i.is_active)
        
     @computed_field(return_type=float)
     def sum(self):
-        return sum([i.quantity*i.product.price for i in self.items if i.is_active == True])
+        return sum(i.quantity * i.product.price for i in self.items if i.is_active)
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -189,6 +345,54 @@ class OrderOut(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class ReservationItem(BaseModel):
+    product_id: int
+    quantity: int
+
+
+class CartReservation(BaseModel):
+    """
+    Резерв товаров корзины до expires_at.
+    """
+    cart_id: int
+    expires_at: datetime
+    items: list[ReservationItem]
+
+
+class CartAvailabilityItem(BaseModel):
+    product_id: int
+    requested: int = Field(..., description="Количество в корзине")
+    available: int = Field(..., description="Остаток за вычетом резервов других корзин")
+    held: int = Field(..., description="Зарезервировано этой корзиной")
+
+
+class CartAvailability(BaseModel):
+    items: list[CartAvailabilityItem]
+    all_available: bool
+
+
+class OrderSummary(BaseModel):
+    """
+    Краткая информация о заказе для списка (без позиций).
+    """
+    id: int
+    user_id: int
+    status: str
+    created_at: datetime
+    updated_at: datetime
+    total_price: float
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class OrderPage(BaseModel):
+    """
+    Страница истории заказов, от новых к старым.
+    """
+    items: list[OrderSummary] = Field(..., description="Заказы текущей страницы")
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы (after), если она есть")
+
+
 class OrderItemCreate(BaseModel):
     product_id: int
     quantity: int
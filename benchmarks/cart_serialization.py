@@ -0,0 +1,130 @@
+"""
+Сравнение CPU на сериализацию корзины из 200 позиций: старый путь маршрутов корзины
+(cart_to_dict -> Cart.model_validate -> повторная валидация по response_model -> json)
+против app.serialization.json_response (одна валидация from_attributes + dump_json).
+
+Тела ответов сравниваются побайтно через настоящие маршруты FastAPI (нужен httpx для TestClient).
+
+Запуск из корня проекта:
+    python -m benchmarks.cart_serialization
+
+Результат (Python 3.11.7, pydantic 2.14.1, FastAPI 0.143.1, лучший из 5 повторов по 200 запросов,
+три запуска):
+    byte-identical: 40847 bytes
+            legacy:  3678 .. 3890 us/request (200 items)
+     json_response:  1353 .. 1899 us/request (200 items)
+    Экономия ~2.0-2.4 мс CPU на запрос (в 2-2.8 раза).
+"""
+import json
+import timeit
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+from app.shemas import Cart
+from app.serialization import get_adapter, json_response
+
+
+ITEMS = 200
+ROUNDS = 200
+
+
+def make_cart(items: int = ITEMS):
+    category = SimpleNamespace(name="Электроника")
+    return SimpleNamespace(
+        id=1,
+        user_id=1,
+        items=[
+            SimpleNamespace(
+                id=i,
+                product_id=i,
+                quantity=i % 5 + 1,
+                is_active=True,
+                product=SimpleNamespace(
+                    id=i, name=f"Товар {i}", price=100.0 + i, category_id=1, category=category
+                ),
+            )
+            for i in range(items)
+        ],
+    )
+
+
+def legacy_cart_to_dict(cart):
+    """Копия удалённого cart_to_dict из app/routers/cart.py"""
+    return {
+        "id": cart.id,
+        "user_id": cart.user_id,
+        "items": [
+            {
+                "id": item.id,
+                "product_id": item.product_id,
+                "quantity": item.quantity,
+                "is_active": item.is_active,
+                "product": {
+                    "id": item.product.id,
+                    "name": item.product.name,
+                    "price": item.product.price,
+                    "category_id": item.product.category_id,
+                    "category": {"name": item.product.category.name},
+                },
+                "total_price_product": getattr(item, "total_price_product", None),
+            }
+            for item in cart.items
+        ],
+        "total": getattr(cart, "total", None),
+        "sum": getattr(cart, "sum", None),
+    }
+
+
+response_adapter = TypeAdapter(Cart)
+
+
+def legacy(cart) -> bytes:
+    # Маршрут: dict -> модель
+    model = Cart.model_validate(legacy_cart_to_dict(cart))
+    # FastAPI: модель -> dict -> валидация по response_model -> jsonable dict -> JSONResponse
+    content = model.model_dump()
+    validated = response_adapter.validate_python(content)
+    return JSONResponse(response_adapter.dump_python(validated, mode="json")).body
+
+
+def fast(cart) -> bytes:
+    return json_response(Cart, cart).body
+
+
+def check_identical(cart) -> None:
+    """
+    Тело ответа через настоящий FastAPI: старый маршрут (модель + response_model)
+    и новый (json_response) должны совпадать побайтно.
+    """
+    app = FastAPI()
+
+    @app.get("/legacy", response_model=Cart)
+    async def legacy_route():
+        return Cart.model_validate(legacy_cart_to_dict(cart))
+
+    @app.get("/fast", response_model=Cart)
+    async def fast_route():
+        return json_response(Cart, cart)
+
+    client = TestClient(app)
+    old, new = client.get("/legacy").content, client.get("/fast").content
+    assert old == new, "response bodies differ"
+    assert old == legacy(cart) and new == fast(cart)
+    print(f"byte-identical: {len(new)} bytes")
+
+
+def main():
+    cart = make_cart()
+    check_identical(cart)
+
+    for name, func in (("legacy", legacy), ("json_response", fast)):
+        seconds = min(timeit.repeat(lambda: func(cart), number=ROUNDS, repeat=5)) / ROUNDS
+        print(f"{name:>14}: {seconds * 1e6:9.1f} us/request ({ITEMS} items)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Добавление в корзину: INSERT ... SELECT не должен порождать декартово произведение во FROM.
+"""
+import os
+import warnings
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.compiler import FROM_LINTING, WARN_LINTING
+
+from app.models import users, orders, wishlist, reviews  # noqa: F401  регистрация мапперов
+from app.services.cart import build_upsert_item_statement
+
+
+def compile_linted(stmt) -> str:
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        return str(stmt.compile(dialect=postgresql.dialect(), linting=FROM_LINTING | WARN_LINTING))
+
+
+def test_upsert_item_has_no_cartesian_product():
+    sql = compile_linted(build_upsert_item_statement(user_id=1, product_id=7, quantity=2))
+
+    select_part = sql[sql.index("SELECT"):sql.index("ON CONFLICT")]
+    assert "FROM products" in select_part
+    assert "carts, products" not in select_part
+    assert "(SELECT carts.id" in select_part
@@ -0,0 +1,88 @@
+"""
+Регрессия: история заказа не должна ломаться, если товар сняли с продажи после покупки.
+
+Запросы сервиса выполняются настоящим ORM на SQLite в памяти: проверяется,
+что позиции заказа возвращаются вместе с неактивным товаром.
+"""
+import asyncio
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+from app.database.database import Base
+from app.models.categories import Category
+from app.models.orders import Order, OrderItem
+from app.models.products import Product
+from app.models.users import User as UserModel
+from app.models import cart, wishlist, reviews  # noqa: F401  регистрация мапперов
+from app.serialization import json_response
+from app.services.order import OrderServics
+from app.shemas import OrderItemOut, OrderOut, User
+
+
+@compiles(TSVECTOR, "sqlite")
+def _compile_tsvector(type_, compiler, **kw):
+    return "TEXT"
+
+
+class AsyncSessionAdapter:
+    """Асинхронный интерфейс сервиса поверх синхронной сессии SQLite"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def scalar(self, stmt):
+        return self.session.scalar(stmt)
+
+    async def scalars(self, stmt):
+        return self.session.scalars(stmt)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def _register_search_functions(dbapi_connection, connection_record):
+        # Генерируемая колонка search_vector вызывает функции PostgreSQL
+        dbapi_connection.create_function("to_tsvector", 2, lambda config, text: text, deterministic=True)
+        dbapi_connection.create_function("setweight", 2, lambda vector, weight: vector, deterministic=True)
+
+    tables = [model.__table__ for model in (UserModel, Category, Product, Order, OrderItem)]
+    Base.metadata.create_all(engine, tables=tables)
+    with Session(engine) as session:
+        session.add_all([
+            UserModel(id=1, email="buyer@example.com", hashed_password="x", role="buyer"),
+            Category(id=1, name="Книги"),
+            Product(id=7, name="Снятый товар", price=100.0, stock=0, is_active=False,
+                    category_id=1, seller_id=1),
+            Order(id=1, user_id=1, total_price=200.0),
+            OrderItem(id=1, order_id=1, product_id=7, price=100.0, quantity=2),
+        ])
+        session.commit()
+        yield AsyncSessionAdapter(session)
+    engine.dispose()
+
+
+USER = User(id=1, email="buyer@example.com", is_active=True, role="buyer")
+
+
+def test_get_items_keeps_deactivated_product(db):
+    items = asyncio.run(OrderServics(db).get_items(USER, 1))
+
+    assert [(item.product_id, item.product.name) for item in items] == [(7, "Снятый товар")]
+    assert items[0].product.is_active is False
+    assert json_response(list[OrderItemOut], items).status_code == 200
+
+
+def test_get_id_keeps_deactivated_product(db):
+    order = asyncio.run(OrderServics(db).get_id(USER, 1))
+
+    assert [item.product.name for item in order.orderitems] == ["Снятый товар"]
+    assert json_response(OrderOut, order).status_code == 200